@@ -1,7 +1,10 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import requests
+from report_client import iter_pages, ReportAPIError
+from stage_timing import current_timer
+from report_html import country_report_html
+from report_models import CountryReport, COUNTRY_VIEW_FIELDS, REPORT_YEARS, projection
 
 # Main function to encapsulate the app logic
 def main():
@@ -86,22 +89,17 @@ def main():
 
 # Function to fetch data from your API
 def fetch_data_for_country(country):
-    url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-    payload = {
-        "sample_key": f'{{"db_path": "credit_research.db", "table": "FullReport", "filters": {{"Country": "{country}"}}, "fields": "*", "page": 1, "page_size": 10}}'
-    }
-
     all_data = []
-    for page in range(1, 3):
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            all_data.extend(response.json())
-        else:
-            st.error(f"Failed to retrieve data for {country} (page {page})")
-            return None
+    try:
+        for query in country_report_queries(country):
+            for rows in iter_pages(query):
+                all_data.extend(rows)
+    except ReportAPIError as e:
+        st.error(f"Failed to retrieve data for {country}: {e}")
+        return None
     
     if all_data:
-        return all_data[0]
+        return CountryReport.from_row(all_data[0])
     else:
         return None
 
@@ -151,52 +149,22 @@ def display_report_for_country(country, color_palette):
         col1, col2 = st.columns([6, 4])
 
         with col1:
-            st.markdown('<div class="reportColumn">', unsafe_allow_html=True)
-            st.markdown(f'<h1 class="reportText">{report.get("Title", "Credit Research Report")}</h1>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Country Information</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>Country:</strong> {report.get("Country", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>Ownership:</strong> {report.get("Ownership", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>NFA Rating:</strong> {report.get("NFARating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>ESG Rating:</strong> {report.get("ESGRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Overview</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Overview", "No overview available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Politics</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("PoliticalNews", "No political news available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Strengths</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Strengths", "No strengths information available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Weaknesses</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Weaknesses", "No weaknesses information available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Opportunities</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Opportunities", "No opportunities information available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Threats</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Threats", "No threats information available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Recent News</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("RecentNews", "No recent news available.")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Ratings and Comments from Credit Rating Agencies</h2>', unsafe_allow_html=True)
-            st.markdown('<h3 class="reportText">Moody\'s:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("MoodysRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown('<h3 class="reportText">S&P Global Ratings:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("SPGlobalRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown('<h3 class="reportText">Fitch Ratings:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("FitchRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown('<h2 class="reportText">Conclusion</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Conclusion", "No conclusion available.")}</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(country_report_html(report), unsafe_allow_html=True)
 
         with col2:
             st.markdown('<div class="chartColumn">', unsafe_allow_html=True)
             st.header("Economic Data (2024 Onwards)")
 
             charts_data = [
-                ("GDP Growth (%)", [report.get(f'GDPGrowthRateYear{i}', 0) for i in range(1, 7)], color_palette[0]),
-                ("Inflation Rate (%)", [report.get(f'InflationYear{i}', 0) for i in range(1, 7)], color_palette[1]),
-                ("Unemployment Rate (%)", [report.get(f'UnemploymentRateYear{i}', 0) for i in range(1, 7)], color_palette[2]),
-                ("Population (millions)", [report.get(f'PopulationYear{i}', 0) for i in range(1, 7)], color_palette[3]),
-                ("Government Budget Balance (% of GDP)", [report.get(f'GovernmentFinancesYear{i}', 0) for i in range(1, 7)], color_palette[4]),
-                ("Current Account Balance (% of GDP)", [report.get(f'CurrentAccountBalanceYear{i}', 0) for i in range(1, 7)], color_palette[5])
+                ("GDP Growth (%)", list(report.gdp_growth), color_palette[0]),
+                ("Inflation Rate (%)", list(report.inflation), color_palette[1]),
+                ("Unemployment Rate (%)", list(report.unemployment), color_palette[2]),
+                ("Population (millions)", list(report.population), color_palette[3]),
+                ("Government Budget Balance (% of GDP)", list(report.government_finances), color_palette[4]),
+                ("Current Account Balance (% of GDP)", list(report.current_account), color_palette[5])
             ]
 
-            years = [2024, 2025, 2026, 2027, 2028, 2029]
+            years = REPORT_YEARS
 
             for metric, values, color in charts_data:
                 df = pd.DataFrame({
@@ -214,40 +182,21 @@ def display_report_for_country(country, color_palette):
     else:
         st.error(f"No report found for {country}.")
 
-if __name__ == "__main__":
-    main()
-
 
-
-
-
-
-def create_country_report_tab(country, color_palette):
+def country_report_queries(country):
     """
-    Function to create a country report tab.
-    :param country: Name of the country for which the report is generated.
-    :param color_palette: List of colors for chart generation.
+    The process_json queries create_country_report_tab pages through for one country.
     """
+    return [{"db_path": "credit_research.db", "table": "FullReport", "filters": {"Country": country},
+             "fields": projection(COUNTRY_VIEW_FIELDS["report"])}]
 
-    def fetch_data_for_country(country):
-        url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-        payload = {
-            "sample_key": f'{{"db_path": "credit_research.db", "table": "FullReport", "filters": {{"Country": "{country}"}}, "fields": "*", "page": 1, "page_size": 10}}'
-        }
-
-        all_data = []
-        for page in range(1, 3):
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                all_data.extend(response.json())
-            else:
-                st.error(f"Failed to retrieve data for {country} (page {page})")
-                return None
+@st.cache_data(show_spinner=False, max_entries=64)
+def country_tab_charts(report, color_palette):
+    """
+    Economic data charts and tables of a country tab, built once per report content.
 
-        if all_data:
-            return all_data[0]
-        else:
-            return None
+    :return: List of (plotly figure, table HTML) pairs.
+    """
 
     def plot_chart(df, y_column, title, color):
         y_min = df[y_column].min()
@@ -290,71 +239,76 @@ def create_country_report_tab(country, color_palette):
         table_html += "</tr></table>"
         return table_html
 
+    charts_data = [
+        ("GDP Growth (%)", list(report.gdp_growth), color_palette[0]),
+        ("Inflation Rate (%)", list(report.inflation), color_palette[1]),
+        ("Unemployment Rate (%)", list(report.unemployment), color_palette[2]),
+        ("Population (millions)", list(report.population), color_palette[3]),
+        ("Government Budget Balance (% of GDP)", list(report.government_finances), color_palette[4]),
+        ("Current Account Balance (% of GDP)", list(report.current_account), color_palette[5])
+    ]
+
+    years = REPORT_YEARS
+
+    charts = []
+    for metric, values, color in charts_data:
+        df = pd.DataFrame({
+            "Year": years,
+            metric: values
+        })
+        charts.append((plot_chart(df, metric, metric, color), create_data_table(df, metric)))
+    return charts
+
+
+def create_country_report_tab(country, color_palette, rows=None):
+    """
+    Function to create a country report tab.
+    :param country: Name of the country for which the report is generated.
+    :param color_palette: List of colors for chart generation.
+    :param rows: The country's FullReport rows if already fetched (e.g. by a batched query).
+    """
+
+    def fetch_data_for_country(country):
+        all_data = []
+        with current_timer().stage(f"fetch:{country}") as stage:
+            try:
+                for query in country_report_queries(country):
+                    for rows in iter_pages(query):
+                        all_data.extend(rows)
+            except ReportAPIError as e:
+                st.error(f"Failed to retrieve data for {country}: {e}")
+                return None
+            stage['rows'] = len(all_data)
+
+        if all_data:
+            return CountryReport.from_row(all_data[0])
+        else:
+            return None
+
     # Fetch and display the report
-    report = fetch_data_for_country(country)
+    if rows is None:
+        report = fetch_data_for_country(country)
+    else:
+        report = CountryReport.from_row(rows[0]) if rows else None
 
     if report:
         col1, col2 = st.columns([6, 4])
 
         with col1:
-            st.markdown('<div class="reportColumn">', unsafe_allow_html=True)
-            st.markdown(f'<h1 class="reportText">{report.get("Title", "Credit Research Report")}</h1>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Country Information</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>Country:</strong> {report.get("Country", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>Ownership:</strong> {report.get("Ownership", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>NFA Rating:</strong> {report.get("NFARating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText"><strong>ESG Rating:</strong> {report.get("ESGRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Overview</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Overview", "No overview available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Politics</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("PoliticalNews", "No political news available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Strengths</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Strengths", "No strengths information available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Weaknesses</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Weaknesses", "No weaknesses information available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Opportunities</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Opportunities", "No opportunities information available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Threats</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Threats", "No threats information available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Recent News</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("RecentNews", "No recent news available.")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Ratings and Comments from Credit Rating Agencies</h2>', unsafe_allow_html=True)
-            st.markdown(f'<h3 class="reportText">Moody\'s:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("MoodysRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h3 class="reportText">S&P Global Ratings:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("SPGlobalRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h3 class="reportText">Fitch Ratings:</h3>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("FitchRating", "N/A")}</p>', unsafe_allow_html=True)
-            st.markdown(f'<h2 class="reportText">Conclusion</h2>', unsafe_allow_html=True)
-            st.markdown(f'<p class="reportText">{report.get("Conclusion", "No conclusion available.")}</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            st.markdown(country_report_html(report), unsafe_allow_html=True)
 
         with col2:
             st.markdown('<div class="chartColumn">', unsafe_allow_html=True)
             st.header("Economic Data (2024 Onwards)")
 
-            charts_data = [
-                ("GDP Growth (%)", [report.get(f'GDPGrowthRateYear{i}', 0) for i in range(1, 7)], color_palette[0]),
-                ("Inflation Rate (%)", [report.get(f'InflationYear{i}', 0) for i in range(1, 7)], color_palette[1]),
-                ("Unemployment Rate (%)", [report.get(f'UnemploymentRateYear{i}', 0) for i in range(1, 7)], color_palette[2]),
-                ("Population (millions)", [report.get(f'PopulationYear{i}', 0) for i in range(1, 7)], color_palette[3]),
-                ("Government Budget Balance (% of GDP)", [report.get(f'GovernmentFinancesYear{i}', 0) for i in range(1, 7)], color_palette[4]),
-                ("Current Account Balance (% of GDP)", [report.get(f'CurrentAccountBalanceYear{i}', 0) for i in range(1, 7)], color_palette[5])
-            ]
-
-            years = [2024, 2025, 2026, 2027, 2028, 2029]
-
-            for metric, values, color in charts_data:
-                df = pd.DataFrame({
-                    "Year": years,
-                    metric: values
-                })
-
-                st.plotly_chart(plot_chart(df, metric, metric, color), use_container_width=True)
-                st.markdown(create_data_table(df, metric), unsafe_allow_html=True)
+            for fig, table_html in country_tab_charts(report, color_palette):
+                st.plotly_chart(fig, use_container_width=True)
+                st.markdown(table_html, unsafe_allow_html=True)
 
             st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.error(f"No report found for {country}.")
 
 
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import requests
+from report_client import fetch_frame, ReportAPIError
+from report_models import FUND_VIEW_FIELDS, projection
 
 st.set_page_config(layout="wide")
 
@@ -15,22 +16,18 @@ color_palette = [
     "#DA70D6"   # Vivid Purple
 ]
 
-# Function to fetch fund data from the API
-def fetch_fund_data(fund_name):
-    url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-    payload = {
-        "sample_key": f'{{"db_path": "consolidated.db", "table": "fund_holdings", "filters": {{"fund_name": "{fund_name}"}}, "fields": "*", "page": 1, "page_size": 100}}'
-    }
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        return pd.DataFrame(data)
-    else:
-        st.error(f"Failed to fetch data for {fund_name}. Status code: {response.status_code}")
+# Function to fetch fund data from the API (every page of the holdings); view "charts" requests
+# only the columns the pie charts read, "table" every column
+def fetch_fund_data(fund_name, view="charts"):
+    try:
+        return fetch_frame({"db_path": "consolidated.db", "table": "fund_holdings", "filters": {"fund_name": fund_name},
+                            "fields": projection(FUND_VIEW_FIELDS[view]), "page_size": 100})
+    except ReportAPIError as e:
+        st.error(f"Failed to fetch data for {fund_name}: {e}")
         return None
 
-# Function to create pie charts and filter the data table
-def create_pie_charts_and_table(fund_data):
+# Function to create pie charts and filter the data table (show_table: fund_data has every column)
+def create_pie_charts_and_table(fund_data, show_table=True):
     if fund_data is not None:
         # Add "Cash" for missing NFA ratings and create the NFA pie chart
         fund_data['nfa_star_rating'] = fund_data['nfa_star_rating'].fillna('Cash')
@@ -78,24 +75,27 @@ def create_pie_charts_and_table(fund_data):
         with col4:
             st.plotly_chart(fig_esg_6, use_container_width=True)
 
-        # Add "All" to the dropdown and filter table by clicking on the pie chart region
-        regions = ["All"] + fund_data['region'].unique().tolist()
-        selected_region = st.selectbox("Filter by Region", options=regions)
+        if show_table:
+            # Add "All" to the dropdown and filter table by clicking on the pie chart region
+            regions = ["All"] + fund_data['region'].unique().tolist()
+            selected_region = st.selectbox("Filter by Region", options=regions)
 
-        if selected_region != "All":
-            filtered_data = fund_data[fund_data['region'] == selected_region]
-        else:
-            filtered_data = fund_data
+            if selected_region != "All":
+                filtered_data = fund_data[fund_data['region'] == selected_region]
+            else:
+                filtered_data = fund_data
 
-        st.write(filtered_data)
+            st.write(filtered_data)
 
 # Main section
 st.title("Shin Kong Emerging Wealthy Nations Bond Fund Overview")
 fund_name = "Shin Kong Emerging Wealthy Nations Bond Fund"
-fund_data = fetch_fund_data(fund_name)
+# The holdings table needs every column, so the full rows are fetched only when it is shown
+show_table = st.checkbox("Show holdings table")
+fund_data = fetch_fund_data(fund_name, "table" if show_table else "charts")
 
 if fund_data is not None:
-    create_pie_charts_and_table(fund_data)
+    create_pie_charts_and_table(fund_data, show_table)
 else:
     st.error("No data available for the selected fund.")
 
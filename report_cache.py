@@ -0,0 +1,99 @@
+# report_cache.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Research data changes at most daily
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def cache_key(db_path, table, filters=None, fields="*", page=1, page_size=10):
+    """
+    Canonical key of a process_json query; filter order does not matter.
+    """
+    return json.dumps([db_path, table, filters or {}, fields, page, page_size], sort_keys=True)
+
+
+class ResponseCache:
+    """
+    TTL cache of process_json responses: an in-memory LRU in front of a SQLite table.
+
+    The SQLite file keeps responses across restarts and is shared by all processes of the app.
+    Entries older than `ttl` seconds count as missing. Cached responses are shared, so callers
+    must not modify them.
+    """
+
+    def __init__(self, path="report_cache.sqlite", ttl=DEFAULT_TTL, maxsize=256):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """
+        :return: The cached response, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                return entry[1]
+            row = self._db.execute("SELECT stored_at, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                return None
+            value = json.loads(row[1])
+            self._remember(key, row[0], value)
+            return value
+
+    def set(self, key, value):
+        stored_at = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses (key, stored_at, body) VALUES (?, ?, ?)",
+                             (key, stored_at, json.dumps(value)))
+            self._db.commit()
+            self._remember(key, stored_at, value)
+
+    def _remember(self, key, stored_at, value):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop every cached response (memory and disk), so the next queries go to the service.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def cache_from_env():
+    """
+    ResponseCache configured by REPORT_CACHE_PATH and REPORT_CACHE_TTL (seconds; 0 disables caching).
+    """
+    ttl = float(os.environ.get("REPORT_CACHE_TTL", DEFAULT_TTL))
+    if ttl <= 0:
+        return None
+    return ResponseCache(os.environ.get("REPORT_CACHE_PATH", "report_cache.sqlite"), ttl)
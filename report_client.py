@@ -0,0 +1,254 @@
+# report_client.py
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from report_cache import cache_key, cache_from_env
+
+PROCESS_JSON_URL = os.environ.get(
+    "PROCESS_JSON_URL", "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
+)
+
+# "remote" (process_json service) or "local" (SQLite files in REPORT_DB_DIR, see report_local)
+REPORT_BACKEND = os.environ.get("REPORT_BACKEND", "remote")
+REPORT_DB_DIR = os.environ.get("REPORT_DB_DIR", ".")
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# Cap on concurrent page requests issued by iter_pages (and per-entity fallbacks of query_many)
+PAGE_LOOKAHEAD = int(os.environ.get("REPORT_PAGE_LOOKAHEAD", 4))
+
+
+class ReportAPIError(Exception):
+    """
+    A process_json request failed: non-200 status (status_code is set) or a network error
+    that outlived the retries (status_code is None).
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def build_payload(db_path, table, filters=None, fields="*", page=1, page_size=10):
+    """
+    Request body for process_json. The service expects the query as a JSON string under 'sample_key'.
+    """
+    query = {
+        "db_path": db_path,
+        "table": table,
+        "filters": filters or {},
+        "fields": fields,
+        "page": page,
+        "page_size": page_size
+    }
+    return {"sample_key": json.dumps(query)}
+
+
+class ReportClient:
+    """
+    process_json client on one keep-alive connection pool.
+
+    Connection errors and 429/5xx responses are retried with exponential backoff
+    (backoff_factor * 2 ** attempt seconds). Queries are read-only, so retrying the POST is safe.
+    Thread-safe; share one instance (see get_client).
+    list_filters is cleared by query_many if the service rejects list-valued (IN) filters.
+
+    With a cache (report_cache.ResponseCache), query() answers repeated queries from it
+    until they expire.
+    """
+
+    def __init__(self, url=PROCESS_JSON_URL, timeout=DEFAULT_TIMEOUT, retries=3, backoff_factor=0.5, pool_size=10,
+                 cache=None):
+        self.url = url
+        self.list_filters = True
+        self.timeout = timeout
+        self.cache = cache
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, payload):
+        """
+        :return: Decoded JSON response.
+        :raises ReportAPIError: On a non-200 status or a network error.
+        """
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ReportAPIError(f"Request to {self.url} failed: {e}") from e
+        if response.status_code != 200:
+            raise ReportAPIError(f"Request to {self.url} returned status {response.status_code}",
+                                 response.status_code)
+        return response.json()
+
+    def query(self, db_path, table, filters=None, fields="*", page=1, page_size=10, refresh=False):
+        """
+        :param refresh: Skip the cache and store the fresh response.
+        :return: List of row dicts for one page of the query (shared if cached: do not modify).
+        """
+        key = cache_key(db_path, table, filters, fields, page, page_size) if self.cache is not None else None
+        if key is not None and not refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        rows = self.post(build_payload(db_path, table, filters, fields, page, page_size))
+        if key is not None:
+            self.cache.set(key, rows)
+        return rows
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide client, so every report module and session shares the same connections.
+
+    A ReportClient for the process_json service, or with REPORT_BACKEND=local a
+    report_local.LocalReportClient reading the databases in REPORT_DB_DIR.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if REPORT_BACKEND == "local":
+                from report_local import LocalReportClient
+                _client = LocalReportClient(REPORT_DB_DIR)
+            elif REPORT_BACKEND == "remote":
+                _client = ReportClient(cache=cache_from_env())
+            else:
+                raise ValueError(f"Unknown REPORT_BACKEND {REPORT_BACKEND!r}; expected 'remote' or 'local'")
+        return _client
+
+
+def iter_pages(query, lookahead=PAGE_LOOKAHEAD, max_pages=None, client=None):
+    """
+    Stream every page of a query, in order, until the first short page.
+
+    Page 1 is fetched alone (most reports fit on it); while pages keep coming back full the
+    number of pages requested ahead doubles up to `lookahead`, so a large result is fetched
+    concurrently and at most lookahead - 1 requests run past its end.
+
+    If page 1 of a query with a column projection fails with status 400 (e.g. the table lacks
+    one of the columns), the query is re-run with fields "*".
+
+    :param query: ReportClient.query keyword dicts (any 'page' is ignored).
+    :param max_pages: Stop after this many pages (None: no limit).
+    :return: Generator of non-empty lists of row dicts.
+    :raises ReportAPIError: From the first page that failed.
+    """
+    client = client or get_client()
+    pages = _iter_pages(query, lookahead, max_pages, client)
+    if query.get("fields", "*") == "*":
+        yield from pages
+        return
+    try:
+        first = next(pages, None)
+    except ReportAPIError as e:
+        if e.status_code != 400:
+            raise
+        pages = _iter_pages({**query, "fields": "*"}, lookahead, max_pages, client)
+        first = next(pages, None)
+    if first is not None:
+        yield first
+        yield from pages
+
+
+def _iter_pages(query, lookahead, max_pages, client):
+    query = {key: value for key, value in query.items() if key != "page"}
+    page_size = query.get("page_size", 10)
+    lookahead = max(1, lookahead)
+
+    with ThreadPoolExecutor(max_workers=lookahead) as executor:
+        pending = deque()
+        next_page = 1
+        window = 1
+        try:
+            while True:
+                while len(pending) < window and (max_pages is None or next_page <= max_pages):
+                    pending.append(executor.submit(client.query, page=next_page, **query))
+                    next_page += 1
+                if not pending:
+                    return
+                rows = pending.popleft().result()
+                if rows:
+                    yield rows
+                if len(rows) < page_size:
+                    return
+                window = min(window * 2, lookahead)
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def fetch_frame(query, lookahead=PAGE_LOOKAHEAD, max_pages=None, client=None):
+    """
+    Every row of a query as one DataFrame, built page by page from iter_pages.
+    """
+    frames = [pd.DataFrame(rows) for rows in iter_pages(query, lookahead, max_pages, client)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def query_many(query, key, values, lookahead=PAGE_LOOKAHEAD, client=None):
+    """
+    Rows of several entities of one table in one query: the filter on `key` becomes the list of
+    values (matched IN-style) and the rows are split client-side by their `key` column.
+
+    The batch keeps the requested page size, so a short page still marks the end of the result;
+    iter_pages fetches any further pages concurrently. If the backend rejects the list filter
+    (status 400), the client is marked as not supporting list filters and each entity is
+    queried on its own, concurrently.
+
+    :param query: ReportClient.query keyword dicts for a single entity (its `key` filter is replaced).
+    :return: Dict value -> list of row dicts (empty for values without rows).
+    :raises ReportAPIError: If a query fails for any other reason.
+    """
+    client = client or get_client()
+    values = list(dict.fromkeys(values))
+    grouped = {value: [] for value in values}
+    if not values:
+        return grouped
+
+    filters = query.get("filters") or {}
+    if getattr(client, "list_filters", True):
+        batch = {**query, "filters": {**filters, key: values}}
+        try:
+            for rows in iter_pages(batch, lookahead, client=client):
+                for row in rows:
+                    grouped.setdefault(row.get(key), []).append(row)
+            return grouped
+        except ReportAPIError as e:
+            if e.status_code != 400:
+                raise
+            client.list_filters = False
+
+    def fetch(value):
+        single = {**query, "filters": {**filters, key: value}}
+        return [row for rows in iter_pages(single, lookahead, client=client) for row in rows]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(lookahead, len(values)))) as executor:
+        for value, rows in zip(values, executor.map(fetch, values)):
+            grouped[value] = rows
+    return grouped
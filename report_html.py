@@ -0,0 +1,62 @@
+# report_html.py
+import html
+from functools import lru_cache
+
+# Heading -> CountryReport attribute, in page order
+COUNTRY_INFO = [
+    ("Country", "country"),
+    ("Ownership", "ownership"),
+    ("NFA Rating", "nfa_rating"),
+    ("ESG Rating", "esg_rating")
+]
+
+COUNTRY_SECTIONS = [
+    ("Overview", "overview"),
+    ("Politics", "political_news"),
+    ("Strengths", "strengths"),
+    ("Weaknesses", "weaknesses"),
+    ("Opportunities", "opportunities"),
+    ("Threats", "threats"),
+    ("Recent News", "recent_news")
+]
+
+AGENCY_RATINGS = [
+    ("Moody's:", "moodys_rating"),
+    ("S&P Global Ratings:", "sp_global_rating"),
+    ("Fitch Ratings:", "fitch_rating")
+]
+
+
+def _text(value):
+    """
+    Escaped field text; line breaks are kept as <br> so the document has no blank lines
+    (st.markdown would end the HTML block there and parse the rest as Markdown).
+    """
+    lines = html.escape(str(value)).replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "<br>".join(line for line in lines if line.strip())
+
+
+@lru_cache(maxsize=128)
+def country_report_html(report):
+    """
+    The text column of a country report as one HTML document, for a single
+    st.markdown(..., unsafe_allow_html=True) call. Field values are escaped.
+
+    Cached by the (frozen, hashable) CountryReport itself, so a report whose content has not
+    changed is never rendered twice.
+    """
+    parts = ['<div class="reportColumn">', f'<h1 class="reportText">{_text(report.title)}</h1>',
+             '<h2 class="reportText">Country Information</h2>']
+    for label, name in COUNTRY_INFO:
+        parts.append(f'<p class="reportText"><strong>{label}:</strong> {_text(getattr(report, name))}</p>')
+    for heading, name in COUNTRY_SECTIONS:
+        parts.append(f'<h2 class="reportText">{heading}</h2>')
+        parts.append(f'<p class="reportText">{_text(getattr(report, name))}</p>')
+    parts.append('<h2 class="reportText">Ratings and Comments from Credit Rating Agencies</h2>')
+    for heading, name in AGENCY_RATINGS:
+        parts.append(f'<h3 class="reportText">{html.escape(heading)}</h3>')
+        parts.append(f'<p class="reportText">{_text(getattr(report, name))}</p>')
+    parts.append('<h2 class="reportText">Conclusion</h2>')
+    parts.append(f'<p class="reportText">{_text(report.conclusion)}</p>')
+    parts.append('</div>')
+    return "\n".join(parts)
@@ -0,0 +1,122 @@
+# report_local.py
+import os
+import sqlite3
+import threading
+
+from report_client import ReportAPIError
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class LocalReportClient:
+    """
+    Answers process_json queries from local copies of the SQLite databases, with the same
+    query() signature and row dicts as ReportClient, for co-located deployments and offline runs.
+
+    Identifiers (table, fields, filter columns) are checked against the schema; filter values are
+    bound as parameters, and a list value matches any of its items (IN). The first query filtering
+    on a set of columns creates an index on them (skipped if the database is read-only).
+    Thread-safe: one connection per thread and database.
+    """
+
+    cache = None
+    list_filters = True
+
+    def __init__(self, db_dir="."):
+        self.db_dir = db_dir
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._indexed = set()
+
+    def _connect(self, db_path):
+        connections = self._local.__dict__.setdefault('connections', {})
+        connection = connections.get(db_path)
+        if connection is None:
+            path = os.path.join(self.db_dir, db_path)
+            if not os.path.exists(path):
+                raise ReportAPIError(f"Database {path} not found", 404)
+            connection = sqlite3.connect(path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connections[db_path] = connection
+        return connection
+
+    def _table_columns(self, connection, db_path, table):
+        key = (db_path, table)
+        with self._lock:
+            columns = self._columns.get(key)
+        if columns is None:
+            columns = [row[1] for row in connection.execute(f"PRAGMA table_info({_quote(table)})")]
+            if not columns:
+                raise ReportAPIError(f"Table {table} not found in {db_path}", 400)
+            with self._lock:
+                self._columns[key] = columns
+        return columns
+
+    def _ensure_index(self, connection, db_path, table, columns):
+        key = (db_path, table, columns)
+        with self._lock:
+            if key in self._indexed:
+                return
+            self._indexed.add(key)
+        name = _quote("idx_" + "_".join((table,) + columns))
+        try:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {_quote(table)} "
+                               f"({', '.join(_quote(column) for column in columns)})")
+            connection.commit()
+        except sqlite3.OperationalError:
+            pass
+
+    def query(self, db_path, table, filters=None, fields="*", page=1, page_size=10, refresh=False):
+        """
+        :param refresh: Accepted for compatibility with ReportClient; there is nothing to refresh.
+        :return: List of row dicts for one page of the query, in rowid order.
+        :raises ReportAPIError: On a missing database, table or column (status 404/400).
+        """
+        filters = filters or {}
+        connection = self._connect(db_path)
+        columns = self._table_columns(connection, db_path, table)
+
+        if fields == "*":
+            selected = "*"
+        else:
+            names = [name.strip() for name in fields.split(",")] if isinstance(fields, str) else list(fields)
+            unknown = [name for name in names if name not in columns]
+            if unknown:
+                raise ReportAPIError(f"Unknown fields {unknown} for table {table}", 400)
+            selected = ", ".join(_quote(name) for name in names)
+
+        unknown = [name for name in filters if name not in columns]
+        if unknown:
+            raise ReportAPIError(f"Unknown filter columns {unknown} for table {table}", 400)
+
+        sql = f"SELECT {selected} FROM {_quote(table)}"
+        params = []
+        if filters:
+            filter_columns = tuple(sorted(filters))
+            self._ensure_index(connection, db_path, table, filter_columns)
+            conditions = []
+            for name in filter_columns:
+                value = filters[name]
+                if isinstance(value, (list, tuple)):
+                    conditions.append(f"{_quote(name)} IN ({', '.join('?' * len(value))})" if value else "0")
+                    params.extend(value)
+                else:
+                    conditions.append(f"{_quote(name)} = ?")
+                    params.append(value)
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY rowid LIMIT ? OFFSET ?"
+        params += [page_size, (max(page, 1) - 1) * page_size]
+
+        try:
+            rows = connection.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise ReportAPIError(f"Query on {db_path}.{table} failed: {e}", 500) from e
+        return [dict(row) for row in rows]
+
+    def close(self):
+        for connection in self._local.__dict__.get('connections', {}).values():
+            connection.close()
+        self._local.__dict__['connections'] = {}
@@ -0,0 +1,116 @@
+# report_models.py
+from dataclasses import dataclass, fields
+
+# Forecast years covered by the FullReport economic series (Year1 = 2024)
+REPORT_YEARS = [2024, 2025, 2026, 2027, 2028, 2029]
+
+# CountryReport attribute -> FullReport column
+COUNTRY_TEXT_COLUMNS = {
+    "country": "Country",
+    "title": "Title",
+    "ownership": "Ownership",
+    "nfa_rating": "NFARating",
+    "esg_rating": "ESGRating",
+    "overview": "Overview",
+    "political_news": "PoliticalNews",
+    "strengths": "Strengths",
+    "weaknesses": "Weaknesses",
+    "opportunities": "Opportunities",
+    "threats": "Threats",
+    "recent_news": "RecentNews",
+    "moodys_rating": "MoodysRating",
+    "sp_global_rating": "SPGlobalRating",
+    "fitch_rating": "FitchRating",
+    "conclusion": "Conclusion"
+}
+
+# CountryReport series attribute -> FullReport column prefix (one column per year: GDPGrowthRateYear1..6)
+COUNTRY_SERIES_COLUMNS = {
+    "gdp_growth": "GDPGrowthRateYear",
+    "inflation": "InflationYear",
+    "unemployment": "UnemploymentRateYear",
+    "population": "PopulationYear",
+    "government_finances": "GovernmentFinancesYear",
+    "current_account": "CurrentAccountBalanceYear"
+}
+
+
+def series_columns(prefix):
+    return [f"{prefix}{year}" for year in range(1, len(REPORT_YEARS) + 1)]
+
+
+@dataclass(frozen=True, slots=True)
+class CountryReport:
+    """
+    One FullReport row. Text fields missing from the row get the fallback the report pages
+    display; series values missing from it are 0.
+    """
+    country: str = "N/A"
+    title: str = "Credit Research Report"
+    ownership: str = "N/A"
+    nfa_rating: str = "N/A"
+    esg_rating: str = "N/A"
+    overview: str = "No overview available."
+    political_news: str = "No political news available."
+    strengths: str = "No strengths information available."
+    weaknesses: str = "No weaknesses information available."
+    opportunities: str = "No opportunities information available."
+    threats: str = "No threats information available."
+    recent_news: str = "No recent news available."
+    moodys_rating: str = "N/A"
+    sp_global_rating: str = "N/A"
+    fitch_rating: str = "N/A"
+    conclusion: str = "No conclusion available."
+    gdp_growth: tuple = ()
+    inflation: tuple = ()
+    unemployment: tuple = ()
+    population: tuple = ()
+    government_finances: tuple = ()
+    current_account: tuple = ()
+
+    @classmethod
+    def from_row(cls, row):
+        values = {name: row[column] for name, column in COUNTRY_TEXT_COLUMNS.items() if column in row}
+        for name, prefix in COUNTRY_SERIES_COLUMNS.items():
+            values[name] = tuple(row.get(column, 0) for column in series_columns(prefix))
+        return cls(**values)
+
+
+@dataclass(frozen=True, slots=True)
+class FundHolding:
+    """
+    The fund_holdings columns the fund charts read (the holdings table shows every column).
+    """
+    fund_name: str
+    region: str = None
+    weighting: float = None
+    nfa_star_rating: object = None
+    esg_country_star_rating: object = None
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**{name: row[name] for name in FUND_HOLDING_FIELDS if name in row})
+
+
+FUND_HOLDING_FIELDS = [field.name for field in fields(FundHolding)]
+
+# Columns to request per view; "*" where a view shows the whole row. A backend that rejects a
+# projection (400, e.g. a column missing from its copy of the table) is re-queried with "*" by iter_pages.
+COUNTRY_VIEW_FIELDS = {
+    "report": list(COUNTRY_TEXT_COLUMNS.values())
+              + [column for prefix in COUNTRY_SERIES_COLUMNS.values() for column in series_columns(prefix)],
+    "text": list(COUNTRY_TEXT_COLUMNS.values()),
+    "economics": ["Country"] + [column for prefix in COUNTRY_SERIES_COLUMNS.values() for column in series_columns(prefix)]
+}
+
+FUND_VIEW_FIELDS = {
+    "charts": FUND_HOLDING_FIELDS,
+    "table": "*"
+}
+
+
+def projection(view_fields):
+    """
+    The 'fields' value of a query for a view's column list.
+    """
+    return view_fields if view_fields == "*" else ", ".join(view_fields)
@@ -0,0 +1,128 @@
+# report_tabs.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+from credit_reports import create_country_report_tab, country_report_queries
+from report_utils import create_fund_report_tab, fund_holdings_query
+from report_client import query_many, ReportAPIError
+from stage_timing import current_timer
+
+# Reports of the dashboard, in display order (each: tab label, type "country" or "fund", and the
+# entity it covers); override with REPORTS_CONFIG
+REPORTS_CONFIG = os.environ.get("REPORTS_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports.json"))
+
+# Shown only when the config file is missing
+FALLBACK_REPORTS = [
+    {"label": "Israel", "type": "country", "entity": "Israel"}
+]
+
+# Column each report type's query filters its entity on
+ENTITY_COLUMNS = {
+    "country": "Country",
+    "fund": "fund_name"
+}
+
+RENDERERS = {
+    "country": create_country_report_tab,
+    "fund": create_fund_report_tab
+}
+
+# Report types (tables) fetched at the same time; each batch also pages concurrently
+FETCH_WORKERS = 4
+
+
+def load_report_config(path=REPORTS_CONFIG):
+    """
+    :return: List of report dicts from the JSON config, or FALLBACK_REPORTS if there is none.
+    :raises ValueError: On a report without a label/entity or of an unknown type.
+    """
+    if not os.path.exists(path):
+        print(f"Warning: report config {path} not found. Showing the fallback reports only.")
+        return FALLBACK_REPORTS
+    with open(path, 'r') as f:
+        reports = json.load(f)
+    for report in reports:
+        if not report.get("label") or not report.get("entity"):
+            raise ValueError(f"Report in {path} needs a label and an entity: {report}")
+        if report.get("type") not in RENDERERS:
+            raise ValueError(f"Unknown report type {report.get('type')!r} in {path}; expected one of {sorted(RENDERERS)}")
+    return reports
+
+
+def report_queries(report):
+    """
+    :return: ReportClient.query keyword dicts the report renders from; the first one is the base of the batched fetch_reports query.
+    """
+    if report["type"] == "country":
+        return country_report_queries(report["entity"])
+    return [fund_holdings_query(report["entity"])]
+
+
+def _fetch_group(timer, report_type, group, client):
+    try:
+        with timer.stage(f"fetch:{report_type}") as stage:
+            grouped = query_many(report_queries(group[0])[0], ENTITY_COLUMNS[report_type],
+                                 [report["entity"] for report in group], client=client)
+            stage['rows'] = sum(len(rows) for rows in grouped.values())
+    except ReportAPIError as e:
+        grouped = {report["entity"]: e for report in group}
+    return grouped
+
+
+def fetch_reports(reports, client=None):
+    """
+    Rows of every report with one batched query per report type (i.e. per table); the batches
+    run concurrently on up to FETCH_WORKERS threads.
+
+    :return: Dict label -> list of row dicts, or the ReportAPIError of its failed batch.
+    """
+    by_type = {}
+    for report in reports:
+        by_type.setdefault(report["type"], []).append(report)
+    # The timer lives in session state, which the worker threads cannot read
+    timer = current_timer()
+    with ThreadPoolExecutor(max_workers=max(1, min(FETCH_WORKERS, len(by_type)))) as executor:
+        futures = {report_type: executor.submit(_fetch_group, timer, report_type, group, client)
+                   for report_type, group in by_type.items()}
+
+    data = {}
+    for report_type, group in by_type.items():
+        grouped = futures[report_type].result()
+        for report in group:
+            data[report["label"]] = grouped[report["entity"]]
+    return data
+
+
+def render_report(report, color_palette, rows=None):
+    """
+    :param rows: The report's rows from fetch_reports (a ReportAPIError is shown as the error);
+                 None to let the report fetch its own.
+    """
+    if isinstance(rows, ReportAPIError):
+        st.error(f"Failed to retrieve data for {report['entity']}: {rows}")
+        return
+    with current_timer().stage(f"tab:{report['entity']}"):
+        if rows is None:
+            RENDERERS[report["type"]](report["entity"], color_palette)
+        elif report["type"] == "fund":
+            create_fund_report_tab(report["entity"], color_palette, pd.DataFrame(rows))
+        else:
+            create_country_report_tab(report["entity"], color_palette, rows)
+
+
+def render_reports(reports, color_palette, data=None, key="active_report"):
+    """
+    Tab strip over the reports that builds only the selected one.
+
+    st.tabs runs the body of every tab on each rerun, so a horizontal radio stands in for it;
+    switching back to a report reuses its cached data and figures.
+
+    :param data: fetch_reports result for the reports, if fetched up front.
+    """
+    labels = [report["label"] for report in reports]
+    active = st.radio("Report", labels, horizontal=True, key=key, label_visibility="collapsed")
+    render_report(reports[labels.index(active)], color_palette, (data or {}).get(active))
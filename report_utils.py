@@ -1,7 +1,11 @@
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import requests
+from report_client import get_client, iter_pages, fetch_frame, ReportAPIError
+from stage_timing import current_timer
+from report_html import country_report_html
+from report_models import CountryReport, COUNTRY_VIEW_FIELDS, FUND_VIEW_FIELDS, REPORT_YEARS, projection
 
 # Custom color palette
 color_palette = [
@@ -41,100 +45,88 @@ def apply_custom_css():
         unsafe_allow_html=True
     )
 
+# Admin-only panels (cache control, stage timings) are enabled with REPORT_ADMIN=1
+def is_report_admin():
+    return os.environ.get("REPORT_ADMIN") == "1"
+
+# Admin-only sidebar control for the cached process_json responses
+def report_cache_panel(enabled=None):
+    if enabled is None:
+        enabled = is_report_admin()
+    cache = get_client().cache
+    if not enabled or cache is None:
+        return
+    with st.sidebar.expander("Report cache", expanded=False):
+        st.write(f"{len(cache)} cached responses, refreshed after {cache.ttl / 3600:g} h")
+        if st.button("Force refresh"):
+            cache.clear()
+            st.rerun()
+
 # Function to fetch country data from the API and create a country report tab
 def create_country_report_tab(entity_name, color_palette, db_name="credit_research.db", table_name="FullReport"):
     apply_custom_css()
     st.write(f"### {entity_name} Report")
-    url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-    payload = {
-        "sample_key": f'{{"db_path": "{db_name}", "table": "{table_name}", "filters": {{"Country": "{entity_name}"}}, "fields": "*", "page": 1, "page_size": 10}}'
-    }
+    try:
+        with current_timer().stage(f"fetch:{entity_name}"):
+            query = {"db_path": db_name, "table": table_name, "filters": {"Country": entity_name},
+                     "fields": projection(COUNTRY_VIEW_FIELDS["report"]), "page_size": 10}
+            data = next(iter_pages(query, max_pages=1), [])
+    except ReportAPIError as e:
+        st.error(f"Failed to fetch data for {entity_name}: {e}")
+        return
 
-    response = requests.post(url, json=payload)
-    
-    if response.status_code == 200:
-        data = response.json()
-        if data:
-            report = data[0]
-
-            col1, col2 = st.columns([6, 4])
-
-            with col1:
-                st.markdown('<div class="reportColumn">', unsafe_allow_html=True)
-                st.markdown(f'<h1 class="reportText">{report.get("Title", "Credit Research Report")}</h1>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Country Information</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText"><strong>Country:</strong> {report.get("Country", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText"><strong>Ownership:</strong> {report.get("Ownership", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText"><strong>NFA Rating:</strong> {report.get("NFARating", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText"><strong>ESG Rating:</strong> {report.get("ESGRating", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Overview</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Overview", "No overview available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Politics</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("PoliticalNews", "No political news available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Strengths</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Strengths", "No strengths information available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Weaknesses</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Weaknesses", "No weaknesses information available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Opportunities</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Opportunities", "No opportunities information available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Threats</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Threats", "No threats information available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Recent News</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("RecentNews", "No recent news available.")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Ratings and Comments from Credit Rating Agencies</h2>', unsafe_allow_html=True)
-                st.markdown('<h3 class="reportText">Moody\'s:</h3>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("MoodysRating", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown('<h3 class="reportText">S&P Global Ratings:</h3>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("SPGlobalRating", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown('<h3 class="reportText">Fitch Ratings:</h3>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("FitchRating", "N/A")}</p>', unsafe_allow_html=True)
-                st.markdown('<h2 class="reportText">Conclusion</h2>', unsafe_allow_html=True)
-                st.markdown(f'<p class="reportText">{report.get("Conclusion", "No conclusion available.")}</p>', unsafe_allow_html=True)
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            with col2:
-                st.markdown('<div class="chartColumn">', unsafe_allow_html=True)
-                st.header("Economic Data (2024 Onwards)")
-
-                charts_data = [
-                    ("GDP Growth (%)", [report.get(f'GDPGrowthRateYear{i}', 0) for i in range(1, 7)], color_palette[0]),
-                    ("Inflation Rate (%)", [report.get(f'InflationYear{i}', 0) for i in range(1, 7)], color_palette[1]),
-                    ("Unemployment Rate (%)", [report.get(f'UnemploymentRateYear{i}', 0) for i in range(1, 7)], color_palette[2]),
-                    ("Population (millions)", [report.get(f'PopulationYear{i}', 0) for i in range(1, 7)], color_palette[3]),
-                    ("Government Budget Balance (% of GDP)", [report.get(f'GovernmentFinancesYear{i}', 0) for i in range(1, 7)], color_palette[4]),
-                    ("Current Account Balance (% of GDP)", [report.get(f'CurrentAccountBalanceYear{i}', 0) for i in range(1, 7)], color_palette[5])
-                ]
-
-                years = [2024, 2025, 2026, 2027, 2028, 2029]
-
-                for metric, values, color in charts_data:
-                    df = pd.DataFrame({
-                        "Year": years,
-                        metric: values
-                    })
-
-                    st.plotly_chart(plot_chart(df, metric, metric, color), use_container_width=True)
-                    st.markdown(create_data_table(df, metric), unsafe_allow_html=True)
-
-                st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.error(f"No data found for {entity_name}.")
-    else:
-        st.error(f"Failed to fetch data for {entity_name}. Status code: {response.status_code}")
-
-# Function to fetch fund data from the API
-def fetch_fund_data(fund_name):
-    url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-    payload = {
-        "sample_key": f'{{"db_path": "consolidated.db", "table": "fund_holdings", "filters": {{"fund_name": "{fund_name}"}}, "fields": "*", "page": 1, "page_size": 100}}'
-    }
-    response = requests.post(url, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        return pd.DataFrame(data)
+    if data:
+        report = CountryReport.from_row(data[0])
+
+        col1, col2 = st.columns([6, 4])
+
+        with col1:
+            st.markdown(country_report_html(report), unsafe_allow_html=True)
+
+        with col2:
+            st.markdown('<div class="chartColumn">', unsafe_allow_html=True)
+            st.header("Economic Data (2024 Onwards)")
+
+            charts_data = [
+                ("GDP Growth (%)", list(report.gdp_growth), color_palette[0]),
+                ("Inflation Rate (%)", list(report.inflation), color_palette[1]),
+                ("Unemployment Rate (%)", list(report.unemployment), color_palette[2]),
+                ("Population (millions)", list(report.population), color_palette[3]),
+                ("Government Budget Balance (% of GDP)", list(report.government_finances), color_palette[4]),
+                ("Current Account Balance (% of GDP)", list(report.current_account), color_palette[5])
+            ]
+
+            years = REPORT_YEARS
+
+            for metric, values, color in charts_data:
+                df = pd.DataFrame({
+                    "Year": years,
+                    metric: values
+                })
+
+                st.plotly_chart(plot_chart(df, metric, metric, color), use_container_width=True)
+                st.markdown(create_data_table(df, metric), unsafe_allow_html=True)
+
+            st.markdown('</div>', unsafe_allow_html=True)
     else:
-        st.error(f"Failed to fetch data for {fund_name}. Status code: {response.status_code}")
+        st.error(f"No data found for {entity_name}.")
+
+# The process_json query behind fetch_fund_data (also the base of the batched dashboard query);
+# view "charts" requests only the columns the pie charts read, "table" every column
+def fund_holdings_query(fund_name, view="charts"):
+    return {"db_path": "consolidated.db", "table": "fund_holdings", "filters": {"fund_name": fund_name},
+            "fields": projection(FUND_VIEW_FIELDS[view]), "page_size": 100}
+
+# Function to fetch fund data from the API (every page of the holdings)
+def fetch_fund_data(fund_name, view="charts"):
+    try:
+        with current_timer().stage(f"fetch:{fund_name}") as stage:
+            data = fetch_frame(fund_holdings_query(fund_name, view))
+            stage['rows'] = len(data)
+    except ReportAPIError as e:
+        st.error(f"Failed to fetch data for {fund_name}: {e}")
         return None
+    return data
 
 def filter_dataframe(df: pd.DataFrame, identifier: str = "", filter_columns: list = None) -> pd.DataFrame:
     if filter_columns is None:
@@ -175,41 +167,48 @@ def filter_dataframe(df: pd.DataFrame, identifier: str = "", filter_columns: lis
     return filtered_df
 
 
-# Function to create pie charts and filter the data table
-def create_pie_charts_and_table(fund_data):
+# Pie charts of a fund, built once per holdings content (st.cache_data hashes the frame)
+@st.cache_data(show_spinner=False, max_entries=32)
+def fund_pie_charts(fund_data):
+    fig_nfa = px.pie(fund_data, names='nfa_star_rating', values='weighting', title="NFA Star Rating Distribution",
+                     color_discrete_sequence=color_palette, hole=0.4)
+    fig_nfa.update_traces(textinfo='percent+label')
+    fig_nfa.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
+                          transition_duration=500)
+
+    fig_esg = px.pie(fund_data, names='esg_country_star_rating', values='weighting', title="ESG Country Star Rating Distribution",
+                     color_discrete_sequence=color_palette, hole=0.4)
+    fig_esg.update_traces(textinfo='percent+label')
+    fig_esg.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
+                          transition_duration=500)
+
+    # Chart for ESG ratings with a rating of 6 or more
+    fig_esg_6 = px.pie(fund_data, names='esg_6_or_more', values='weighting', title="ESG Ratings 6 or More",
+                       color_discrete_sequence=color_palette, hole=0.4)
+    fig_esg_6.update_traces(textinfo='percent+label')
+    fig_esg_6.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
+                            transition_duration=500)
+
+    # Region pie chart
+    fig_region = px.pie(fund_data, names='region', values='weighting', title="Region Distribution",
+                        color_discrete_sequence=color_palette, hole=0.4)
+    fig_region.update_traces(textinfo='percent+label')
+    fig_region.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
+                             transition_duration=500)
+
+    return fig_region, fig_nfa, fig_esg, fig_esg_6
+
+
+# Function to create pie charts and filter the data table (show_table: fund_data has every column)
+def create_pie_charts_and_table(fund_data, show_table=True):
     if fund_data is not None:
-        # Add "Cash" for missing NFA ratings and create the NFA pie chart
+        # Add "Cash" for missing NFA and ESG ratings
         fund_data['nfa_star_rating'] = fund_data['nfa_star_rating'].fillna('Cash')
-        fig_nfa = px.pie(fund_data, names='nfa_star_rating', values='weighting', title="NFA Star Rating Distribution",
-                         color_discrete_sequence=color_palette, hole=0.4)
-        fig_nfa.update_traces(textinfo='percent+label')
-        fig_nfa.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
-                              transition_duration=500)
-
-        # Add "Cash" for missing ESG ratings and create the ESG pie chart
         fund_data['esg_country_star_rating'] = fund_data['esg_country_star_rating'].fillna('Cash')
-        fig_esg = px.pie(fund_data, names='esg_country_star_rating', values='weighting', title="ESG Country Star Rating Distribution",
-                         color_discrete_sequence=color_palette, hole=0.4)
-        fig_esg.update_traces(textinfo='percent+label')
-        fig_esg.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
-                              transition_duration=500)
-
-        # Create a chart for ESG ratings with a rating of 6 or more
         fund_data['esg_6_or_more'] = fund_data['esg_country_star_rating'].apply(
             lambda x: 'ESG >= 6' if isinstance(x, (int, float)) and x >= 6 else 'ESG < 6 or Cash'
         )
-        fig_esg_6 = px.pie(fund_data, names='esg_6_or_more', values='weighting', title="ESG Ratings 6 or More",
-                           color_discrete_sequence=color_palette, hole=0.4)
-        fig_esg_6.update_traces(textinfo='percent+label')
-        fig_esg_6.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
-                                transition_duration=500)
-
-        # Create a Region pie chart
-        fig_region = px.pie(fund_data, names='region', values='weighting', title="Region Distribution",
-                            color_discrete_sequence=color_palette, hole=0.4)
-        fig_region.update_traces(textinfo='percent+label')
-        fig_region.update_layout(paper_bgcolor='#1f1f1f', plot_bgcolor='#1f1f1f', font=dict(color='white'), height=500, width=500, 
-                                 transition_duration=500)
+        fig_region, fig_nfa, fig_esg, fig_esg_6 = fund_pie_charts(fund_data)
 
         # Create two rows for the charts
         col1, col2 = st.columns([1, 1])
@@ -224,20 +223,26 @@ def create_pie_charts_and_table(fund_data):
         with col4:
             st.plotly_chart(fig_esg_6, use_container_width=True)
 
-        # Apply the filters to the table data
-        filtered_data = filter_dataframe(fund_data)
+        if show_table:
+            # Apply the filters to the table data
+            filtered_data = filter_dataframe(fund_data)
 
-        # Display the filtered DataFrame
-        st.write(filtered_data)
+            # Display the filtered DataFrame
+            st.write(filtered_data)
 
-# Function to create the fund report tab
-def create_fund_report_tab(fund_name, color_palette):
+# Function to create the fund report tab (fund_data: the chart columns of the holdings if already fetched).
+# The holdings table needs every column, so it is fetched only when it is switched on.
+def create_fund_report_tab(fund_name, color_palette, fund_data=None):
     apply_custom_css()
     st.write(f"### {fund_name} Fund Report")
-    fund_data = fetch_fund_data(fund_name)
+    show_table = st.checkbox("Show holdings table", key=f"holdings_table_{fund_name}")
+    if show_table:
+        fund_data = fetch_fund_data(fund_name, "table")
+    elif fund_data is None:
+        fund_data = fetch_fund_data(fund_name, "charts")
     
     if fund_data is not None:
-        create_pie_charts_and_table(fund_data)
+        create_pie_charts_and_table(fund_data, show_table)
     else:
         st.error(f"No data found for {fund_name}.")
 
@@ -0,0 +1,164 @@
+# stage_timing.py
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# One JSON line per rerun; override with STAGE_TIMING_FILE
+METRICS_PATH = os.environ.get('STAGE_TIMING_FILE', os.path.join('metrics', 'stage_timings.jsonl'))
+
+_export_lock = threading.Lock()
+
+
+class RerunTimer:
+    """
+    Durations and row counts of the stages of one Streamlit rerun.
+
+        timer = RerunTimer('RVM Calculator')
+        with timer.stage('read_excel') as stage:
+            df = load_data(path)
+            stage['rows'] = len(df)
+        timer.finish()
+
+    With profile=True the whole rerun also runs under cProfile until finish().
+    """
+
+    def __init__(self, page, profile=False):
+        self.page = page
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = []
+        self.total = None
+        self.profile_text = None
+        self.profile_path = None
+        self._profiler = cProfile.Profile() if profile else None
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        record = {'stage': name, 'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.stages.append(record)
+
+    def finish(self, path=METRICS_PATH):
+        """
+        Stop the clock (and the profiler), then append the rerun to the metrics file.
+        """
+        if self.total is not None:
+            return
+        self.total = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._save_profile(os.path.dirname(path) or '.')
+        self.export(path)
+
+    def _save_profile(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        self.profile_path = os.path.join(directory, f"profile_{self.page.replace(' ', '_')}_{stamp}.prof")
+        self._profiler.dump_stats(self.profile_path)
+        text = io.StringIO()
+        pstats.Stats(self._profiler, stream=text).sort_stats('cumulative').print_stats(30)
+        self.profile_text = text.getvalue()
+
+    def export(self, path=METRICS_PATH):
+        line = json.dumps({
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'page': self.page,
+            'total_seconds': self.total,
+            'stages': self.stages
+        })
+        with _export_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a') as f:
+                f.write(line + '\n')
+
+    def frame(self):
+        return pd.DataFrame(self.stages, columns=['stage', 'seconds', 'rows'])
+
+
+def read_metrics(path=METRICS_PATH):
+    """
+    :return: DataFrame with one row per recorded stage (timestamp, page, stage, seconds, rows).
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['timestamp', 'page', 'stage', 'seconds', 'rows'])
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            rerun = json.loads(line)
+            for stage in rerun['stages']:
+                rows.append({'timestamp': rerun['timestamp'], 'page': rerun['page'], **stage})
+    return pd.DataFrame(rows, columns=['timestamp', 'page', 'stage', 'seconds', 'rows'])
+
+
+def start_rerun(page):
+    """
+    Start timing the current Streamlit rerun; profiles it if that was requested on the previous one.
+    """
+    import streamlit as st
+    timer = RerunTimer(page, profile=st.session_state.pop('profile_next_rerun', False))
+    st.session_state['rerun_timer'] = timer
+    return timer
+
+
+@contextmanager
+def timed_rerun(page):
+    """
+    start_rerun for a page body that always finishes the timer, including reruns that end in
+    st.rerun(), st.stop() or an exception, so the profiler is stopped and the rerun recorded.
+
+        with timed_rerun('Reports') as timer:
+            ...
+            timing_panel(timer, is_admin())
+    """
+    timer = start_rerun(page)
+    try:
+        yield timer
+    finally:
+        timer.finish()
+
+
+def current_timer():
+    """
+    The timer of the current rerun, or an untracked one outside start_rerun/timing_panel.
+    """
+    import streamlit as st
+    timer = st.session_state.get('rerun_timer')
+    return timer if timer is not None and timer.total is None else RerunTimer('untracked')
+
+
+def timing_panel(timer, enabled=None):
+    """
+    Finish the rerun and, if enabled, show its stage timings in the sidebar.
+
+    :param enabled: Whether to show the panel (e.g. is_admin()); defaults to the
+                    STAGE_TIMING_PANEL environment variable being set to 1.
+    """
+    import streamlit as st
+    timer.finish()
+    if enabled is None:
+        enabled = os.environ.get('STAGE_TIMING_PANEL') == '1'
+    if not enabled:
+        return
+
+    with st.sidebar.expander('Stage timings', expanded=False):
+        st.write(f"{timer.page}: {timer.total * 1e3:.0f} ms")
+        st.dataframe(timer.frame().style.format({'seconds': "{:.3f}"}, na_rep=''))
+        if timer.profile_text:
+            st.write(f"cProfile written to {timer.profile_path}")
+            st.code(timer.profile_text)
+        if st.button('Profile next rerun'):
+            st.session_state['profile_next_rerun'] = True
+            st.rerun()
@@ -1,8 +1,9 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import requests
-import json
+from report_client import iter_pages, ReportAPIError
+from report_html import country_report_html
+from report_models import CountryReport, COUNTRY_VIEW_FIELDS, REPORT_YEARS, projection
 
 st.set_page_config(layout="wide")
 
@@ -59,34 +60,26 @@ st.markdown(
 # Country selection dropdown
 selected_country = st.selectbox('Select a Country:', ['Israel', 'Mexico', 'Qatar', 'Saudi Arabia'])
 
-# Define the URL for the process_json endpoint
-url = "https://my-combined-app-vpljqiia2a-uc.a.run.app/process_json"
-
-# Function to fetch data with pagination and error handling
-def fetch_data(payload, page=1):
-    payload["sample_key"] = payload["sample_key"].replace('"page": 1', f'"page": {page}')
+# Function to fetch every page of a query with error handling
+def fetch_data(query):
+    all_data = []
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching data for page {page}: {e}")
+        for rows in iter_pages(query):
+            all_data.extend(rows)
+    except ReportAPIError as e:
+        st.error(f"Error fetching data: {e}")
         st.stop()  # Stop execution if data fetching fails
+    return all_data
 
-# Update the payload dynamically based on selected country
-payload = {
-    "sample_key": f'{{"db_path": "credit_research.db", "table": "FullReport", "filters": {{"Country": "{selected_country}"}}, "fields": "*", "page": 1, "page_size": 10}}'
-}
+# Query for the selected country
+query = {"db_path": "credit_research.db", "table": "FullReport", "filters": {"Country": selected_country},
+         "fields": projection(COUNTRY_VIEW_FIELDS["report"]), "page_size": 10}
 
-# Fetch data for pages 1 and 2 with error handling
-all_data = []
-for page in range(1, 3):
-    data_chunk = fetch_data(payload, page)
-    all_data.extend(data_chunk)
+all_data = fetch_data(query)
 
 # Check if the first page has data before assigning 'report'
 if all_data and len(all_data[0]) > 0:
-    report = all_data[0]
+    report = CountryReport.from_row(all_data[0])
 else:
     st.error("No data available for the selected country.")
     st.stop()
@@ -96,50 +89,7 @@ col1, col2 = st.columns([6, 4])
 
 # Generate the report in the left-hand column
 with col1:
-    st.markdown('<div class="reportColumn">', unsafe_allow_html=True)
-    st.markdown(f'<h1 class="reportText">{report.get("Title", "Credit Research Report")}</h1>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Country Information</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">Country: {report.get("Country", "N/A")}</p>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">Ownership: {report.get("Ownership", "N/A")}</p>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">NFA Rating: {report.get("NFARating", "N/A")}</p>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">ESG Rating: {report.get("ESGRating", "N/A")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Overview</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Overview", "No overview available.")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Politics</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("PoliticalNews", "No political news available.")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Strengths</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Strengths", "No strengths information available.")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Weaknesses</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Weaknesses", "No weaknesses information available.")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Opportunities</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Opportunities", "No opportunities information available.")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h2 class="reportText">Threats</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Threats", "No threats information available.")}</p>', unsafe_allow_html=True)
-
-    st.markdown('<h2 class="reportText">Recent News</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("RecentNews", "No recent news available.")}</p>', unsafe_allow_html=True)
-
-    st.markdown('<h2 class="reportText">Ratings and Comments from Credit Rating Agencies</h2>', unsafe_allow_html=True)
-    st.markdown('<h3 class="reportText">Moody\'s:</h3>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("MoodysRating", "N/A")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h3 class="reportText">S&P Global Ratings:</h3>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("SPGlobalRating", "N/A")}</p>', unsafe_allow_html=True)
-    
-    st.markdown('<h3 class="reportText">Fitch Ratings:</h3>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("FitchRating", "N/A")}</p>', unsafe_allow_html=True)
-
-    st.markdown('<h2 class="reportText">Conclusion</h2>', unsafe_allow_html=True)
-    st.markdown(f'<p class="reportText">{report.get("Conclusion", "No conclusion available.")}</p>', unsafe_allow_html=True)
-
-    st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown(country_report_html(report), unsafe_allow_html=True)
 
 # Generate charts and data tables in the right-hand column
 with col2:
@@ -198,15 +148,15 @@ with col2:
 
     # Create all dataframes
     charts_data = [
-        ("GDP Growth (%)", [report.get(f'GDPGrowthRateYear{i}', 0) for i in range(1, 7)], color_palette[0]),
-        ("Inflation Rate (%)", [report.get(f'InflationYear{i}', 0) for i in range(1, 7)], color_palette[1]),
-        ("Unemployment Rate (%)", [report.get(f'UnemploymentRateYear{i}', 0) for i in range(1, 7)], color_palette[2]),
-        ("Population (millions)", [report.get(f'PopulationYear{i}', 0) for i in range(1, 7)], color_palette[3]),
-        ("Government Budget Balance (% of GDP)", [report.get(f'GovernmentFinancesYear{i}', 0) for i in range(1, 7)], color_palette[4]),
-        ("Current Account Balance (% of GDP)", [report.get(f'CurrentAccountBalanceYear{i}', 0) for i in range(1, 7)], color_palette[5])
+        ("GDP Growth (%)", list(report.gdp_growth), color_palette[0]),
+        ("Inflation Rate (%)", list(report.inflation), color_palette[1]),
+        ("Unemployment Rate (%)", list(report.unemployment), color_palette[2]),
+        ("Population (millions)", list(report.population), color_palette[3]),
+        ("Government Budget Balance (% of GDP)", list(report.government_finances), color_palette[4]),
+        ("Current Account Balance (% of GDP)", list(report.current_account), color_palette[5])
     ]
 
-    years = [2024, 2025, 2026, 2027, 2028, 2029]
+    years = REPORT_YEARS
 
     for metric, values, color in charts_data:
         df = pd.DataFrame({
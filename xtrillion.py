@@ -3,8 +3,9 @@ st.set_page_config(layout="wide")
 import pandas as pd
 import plotly.express as px
 import requests
-from credit_reports import create_country_report_tab
-from report_utils import create_fund_report_tab
+from report_utils import report_cache_panel, is_report_admin
+from report_tabs import load_report_config, fetch_reports, render_reports
+from stage_timing import timed_rerun, timing_panel
 
 # Custom CSS for background and text colors (matching credit_reports.py)
 st.markdown(
@@ -68,25 +69,15 @@ color_palette = [
     "#DA70D6"   # Vivid Purple
 ]
 
-# Define tabs for countries and funds
-tabs = st.tabs(["Israel", "Qatar", "Mexico", "Saudi Arabia", "SKEWNBF", "SKESBF"])
+# Finishes the timer however the rerun ends (st.rerun, st.stop or an exception)
+with timed_rerun('Reports') as timer:
+    reports = load_report_config()
 
-# Country reports
-with tabs[0]:
-    create_country_report_tab("Israel", color_palette)
+    # One batched query per table covers every report
+    report_data = fetch_reports(reports)
 
-with tabs[1]:
-    create_country_report_tab("Qatar", color_palette)
+    # Only the selected report is built on each rerun
+    render_reports(reports, color_palette, report_data)
 
-with tabs[2]:
-    create_country_report_tab("Mexico", color_palette)
-
-with tabs[3]:
-    create_country_report_tab("Saudi Arabia", color_palette)
-
-# Fund reports
-with tabs[4]:
-    create_fund_report_tab("Shin Kong Emerging Wealthy Nations Bond Fund", color_palette)
-
-with tabs[5]:
-    create_fund_report_tab("Shin Kong Environmental Sustainability Bond Fund", color_palette)
+    report_cache_panel()
+    timing_panel(timer, is_report_admin())
@@ -0,0 +1,235 @@
+# benchmarks/bench_calculations.py
+"""
+Benchmarks for the RVM pipeline on synthetic bond universes.
+
+Run from the app directory:
+
+    python -m benchmarks.bench_calculations                          # 1k, 10k, 100k, 1M bonds
+    python -m benchmarks.bench_calculations --sizes 1000 10000 --save benchmarks/baselines/latest.json
+    python -m benchmarks.bench_calculations --compare benchmarks/baselines/latest.json --threshold 0.25
+
+Every benchmark reports the best wall time over --repeat runs, the peak Python memory of one
+further run (tracemalloc) and the throughput in bonds per second. --save writes the results as
+JSON; --compare flags benchmarks whose wall time grew by more than --threshold relative to a
+saved baseline and exits with status 1 if any did. It also exits with status 1 if an optimized
+path is not faster than the implementation it replaced (SPEEDUP_BASELINES). Baselines are only comparable on the same
+machine and library versions, which are recorded alongside the results.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from bond_pricing.calculations import perform_regressions, warf_to_rating_nums, create_rvm_grids
+from bond_pricing.data_processing import IsinMaster, map_isin
+from bond_pricing.pipeline import RATING_NUM_MAP, RVM_DURATIONS, process_bonds, build_warf_map_sorted
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Bonds per upload in the map_isin benchmarks
+UPLOAD_ROWS = 500
+
+# Optimized benchmark -> the benchmark of the implementation it replaced; it must be faster
+SPEEDUP_BASELINES = {
+    'map_isin': 'map_isin_baseline'
+}
+
+# Moody's idealised WARF factors
+WARF_BY_RATING = {
+    'Aaa': 1, 'Aa1': 10, 'Aa2': 20, 'Aa3': 40, 'A1': 70, 'A2': 120, 'A3': 180,
+    'Baa1': 260, 'Baa2': 360, 'Baa3': 610, 'Ba1': 940, 'Ba2': 1350, 'Ba3': 1766,
+    'B1': 2220, 'B2': 2720, 'B3': 3490, 'Caa1': 4770, 'Caa2': 6500, 'Caa3': 8070,
+    'Ca': 10000, 'C': 10000
+}
+
+
+def synthetic_universe(n_bonds, seed=0):
+    """
+    Raw bond frame shaped like bond_pricing.xlsx, with spreads following the Numerical model plus noise.
+    """
+    rng = np.random.default_rng(seed)
+    ratings = np.array(list(RATING_NUM_MAP))
+    rating = rng.choice(ratings, n_bonds)
+    rating_num = pd.Series(rating).map(RATING_NUM_MAP).to_numpy()
+    oad = rng.uniform(0.25, 25, n_bonds)
+    oas = np.exp(3.0 + 0.15 * np.log(oad) + 0.17 * rating_num + rng.normal(0, 0.3, n_bonds))
+    return pd.DataFrame({
+        'ISIN': [f"XS{i:010d}" for i in range(n_bonds)],
+        'Country': rng.choice(['US', 'DE', 'FR', 'GB', 'BR', 'MX', 'ID', 'ZA'], n_bonds),
+        'Ccy': rng.choice(['USD', 'EUR', 'GBP'], n_bonds),
+        'Sector': rng.choice(['Sovereign', 'Financial', 'Industrial', 'Utility'], n_bonds),
+        'Index Rating (String)': [f"{r} (stable)" for r in rating],
+        'Rating': rating,
+        'warf': pd.Series(rating).map(WARF_BY_RATING).to_numpy(dtype=float),
+        'Price': rng.uniform(70, 120, n_bonds),
+        'YTW': oas / 100 + rng.uniform(2, 4.5, n_bonds),
+        'OAD': oad,
+        'OAS': oas,
+        'MV (USD)': rng.uniform(1e6, 1e9, n_bonds),
+    })
+
+
+def measure(run, setup=None, repeat=3):
+    """
+    :param run: Callable benchmarked; receives setup()'s result if setup is given.
+    :return: Dict with best wall time ('seconds') and tracemalloc peak ('peak_mb').
+    """
+    timings = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - start)
+
+    args = () if setup is None else (setup(),)
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_mb': peak / 1e6}
+
+
+def benchmark_size(n_bonds, repeat=3):
+    raw = synthetic_universe(n_bonds)
+    processed = process_bonds(raw.copy())
+    df_num = processed[processed['rating_num'].notnull()]
+    warf_map_sorted = build_warf_map_sorted(processed)
+    ratings_order = [rating for rating, _ in sorted(RATING_NUM_MAP.items(), key=lambda x: x[1])]
+    _, coeffs_num, _, _, coeffs_warf, _ = perform_regressions(df_num.copy(), warf_map_sorted)
+
+    results = {}
+    results['process_data'] = measure(process_bonds, lambda: raw.copy(), repeat)
+    results['perform_regressions'] = measure(lambda df: perform_regressions(df, warf_map_sorted),
+                                             lambda: df_num.copy(), repeat)
+    results['warf_to_rating_num'] = measure(lambda: warf_to_rating_nums(processed['warf'], warf_map_sorted),
+                                            repeat=repeat)
+    # Includes building the WARF map from the universe, as the app does before every grid
+    results['create_rvm_grids'] = measure(
+        lambda: create_rvm_grids(ratings_order, RVM_DURATIONS, coeffs_num, coeffs_warf,
+                                 dict(zip(processed['Rating'], processed['warf'])), RATING_NUM_MAP),
+        repeat=repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        master_path = os.path.join(tmp_dir, 'extended_bond_data.csv')
+        raw[['ISIN', 'Country', 'Sector', 'Index Rating (String)']].to_csv(master_path, index=False)
+        results['isin_master_load'] = measure(lambda: IsinMaster(master_path), repeat=repeat)
+        # A typical upload: a few hundred bonds enriched against the whole master
+        uploaded = raw[['ISIN', 'Price', 'OAD', 'OAS']].sample(min(UPLOAD_ROWS, n_bonds), random_state=0)
+        # Steady state: the shared master is loaded by the first call and reused afterwards
+        map_isin(uploaded, master_path)
+        results['map_isin'] = measure(lambda: map_isin(uploaded, master_path), repeat=repeat)
+        # What map_isin did before the indexed master: read the CSV and merge on every call
+        results['map_isin_baseline'] = measure(
+            lambda: uploaded.merge(pd.read_csv(master_path), on='ISIN', how='left', indicator=True),
+            repeat=repeat)
+        results['map_isin']['rows'] = results['map_isin_baseline']['rows'] = len(uploaded)
+
+    for result in results.values():
+        # Bonds actually processed: the upload for map_isin, the whole universe otherwise
+        result.setdefault('rows', n_bonds)
+        result['bonds_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] > 0 else float('inf')
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=3):
+    """
+    :return: Dict with 'environment' and 'results' ({'<benchmark>@<n_bonds>': metrics}).
+    """
+    results = {}
+    for n_bonds in sizes:
+        for name, metrics in benchmark_size(n_bonds, repeat).items():
+            key = f"{name}@{n_bonds}"
+            results[key] = {'benchmark': name, 'n_bonds': n_bonds, **metrics}
+            print(f"{key:<32} {metrics['seconds'] * 1e3:>10.2f} ms {metrics['peak_mb']:>10.1f} MB "
+                  f"{metrics['bonds_per_sec']:>14,.0f} bonds/s")
+    return {'environment': environment(), 'results': results}
+
+
+def environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(current, baseline, threshold=0.25):
+    """
+    :return: List of (key, baseline seconds, current seconds, ratio) for benchmarks slower than
+             baseline by more than `threshold` (0.25 = 25%).
+    """
+    regressions = []
+    for key, metrics in current['results'].items():
+        previous = baseline['results'].get(key)
+        if previous is None or previous['seconds'] <= 0:
+            continue
+        ratio = metrics['seconds'] / previous['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((key, previous['seconds'], metrics['seconds'], ratio))
+    return regressions
+
+
+def check_speedups(current):
+    """
+    :return: List of (key, seconds, baseline key, baseline seconds) where an optimized path is not
+             faster than the implementation it replaced.
+    """
+    failures = []
+    for key, metrics in current['results'].items():
+        baseline_key = SPEEDUP_BASELINES.get(metrics['benchmark'])
+        if baseline_key is None:
+            continue
+        baseline_key = f"{baseline_key}@{metrics['n_bonds']}"
+        baseline = current['results'].get(baseline_key)
+        if baseline is not None and metrics['seconds'] >= baseline['seconds']:
+            failures.append((key, metrics['seconds'], baseline_key, baseline['seconds']))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the RVM pipeline on synthetic universes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Universe sizes (bonds).')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (best is kept).')
+    parser.add_argument('--save', help='Write the results as a JSON baseline to this path.')
+    parser.add_argument('--compare', help='Baseline JSON to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown before flagging (default 0.25).')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.sizes, args.repeat)
+
+    status = 0
+    for key, seconds, baseline_key, baseline_seconds in check_speedups(current):
+        print(f"NOT FASTER {key}: {seconds * 1e3:.2f} ms vs {baseline_key}: {baseline_seconds * 1e3:.2f} ms")
+        status = 1
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for key, before, after, ratio in regressions:
+            print(f"SLOWER {key}: {before * 1e3:.2f} ms -> {after * 1e3:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No benchmark slower than {args.compare} by more than {args.threshold:.0%}.")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,9 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 from andy_rvm import perform_regression, create_rvm_grid, warf_to_rating_num
+from bond_pricing.ingest import read_excel_cached
+from stage_timing import timed_rerun, current_timer, timing_panel
 
 def load_data(file_path):
-    return pd.read_excel(file_path)
+    return read_excel_cached(file_path)
 
 def filter_data(df, excluded_columns, country_list, min_notches, min_return):
     if excluded_columns:
@@ -56,12 +58,17 @@ def create_rvm_heatmap(rvm_df, title):
     )
     return fig
 
+# The timer is finished however the rerun ends (st.rerun, st.stop or an exception)
+@timed_rerun('Bond Analysis')
 def main():
     st.title('Bond Analysis Dashboard')
+    timer = current_timer()
 
     # Load data
     file_path = 'bond_pricing_analysis.xlsx'
-    df = load_data(file_path)
+    with timer.stage('read_excel') as stage:
+        df = load_data(file_path)
+        stage['rows'] = len(df)
 
     # Sidebar for filters
     st.sidebar.header('Filters')
@@ -81,21 +88,26 @@ def main():
     min_return = st.sidebar.slider('Minimum expected return (%)', 0.0, 30.0, 0.0, 0.1)
 
     # Filter data
-    filtered_df = filter_data(df, excluded_columns, country_list, min_notches, min_return)
+    with timer.stage('filters') as stage:
+        filtered_df = filter_data(df, excluded_columns, country_list, min_notches, min_return)
+        stage['rows'] = len(filtered_df)
 
     # Display filtered data
     st.subheader('Filtered Bond Data')
-    st.dataframe(filtered_df)
+    with timer.stage('dataframe', rows=len(filtered_df)):
+        st.dataframe(filtered_df)
 
     # Create and display scatter plot
     st.subheader('Bond Scatter Plot: OAS vs OAD')
-    scatter_fig = create_scatter_plot(filtered_df)
-    st.plotly_chart(scatter_fig)
+    with timer.stage('scatter_plot', rows=len(filtered_df)):
+        scatter_fig = create_scatter_plot(filtered_df)
+        st.plotly_chart(scatter_fig)
 
     # Create and display bar chart
     st.subheader('Expected Return by Bond')
-    bar_fig = create_bar_chart(filtered_df)
-    st.plotly_chart(bar_fig)
+    with timer.stage('bar_chart', rows=len(filtered_df)):
+        bar_fig = create_bar_chart(filtered_df)
+        st.plotly_chart(bar_fig)
 
     # RVM Grid Creation
     st.subheader('Risk-Value Matrix (RVM) Grids')
@@ -118,8 +130,9 @@ def main():
     warf_map_sorted['rating_num'] = warf_map_sorted['rating_num'].astype(int)
 
     # Perform regressions
-    df_num, coeffs_num, r2_num = perform_regression(df_num, 'Numerical')
-    df_warf, coeffs_warf, r2_warf = perform_regression(df_warf, 'WARF', warf_map_sorted=warf_map_sorted)
+    with timer.stage('regressions', rows=len(df_num)):
+        df_num, coeffs_num, r2_num = perform_regression(df_num, 'Numerical')
+        df_warf, coeffs_warf, r2_warf = perform_regression(df_warf, 'WARF', warf_map_sorted=warf_map_sorted)
 
     # Define ratings and durations for RVM grids
     ratings_order = [
@@ -131,8 +144,9 @@ def main():
     durations = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15, 20]
 
     # Create RVM Grids
-    rvm_num = create_rvm_grid(ratings_order, durations, 'Numerical', coeffs_num)
-    rvm_warf = create_rvm_grid(ratings_order, durations, 'WARF', coeffs_warf, warf_map=warf_map)
+    with timer.stage('rvm_grids'):
+        rvm_num = create_rvm_grid(ratings_order, durations, 'Numerical', coeffs_num)
+        rvm_warf = create_rvm_grid(ratings_order, durations, 'WARF', coeffs_warf, warf_map=warf_map)
 
     # Display RVM Grids
     st.subheader('Numerical Rating RVM Grid')
@@ -155,5 +169,7 @@ def main():
         mime="text/csv",
     )
 
+    timing_panel(timer)
+
 if __name__ == "__main__":
     main()
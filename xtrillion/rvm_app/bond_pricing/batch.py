@@ -0,0 +1,187 @@
+# bond_pricing/batch.py
+"""
+Headless RVM runner for nightly jobs.
+
+    python -m bond_pricing.batch prices/*.xlsx --output-dir rvm_outputs --workers 4
+
+Every workbook is processed in its own worker process and gets a directory
+<output-dir>/<workbook name>/ with:
+
+    rvm_num.csv, rvm_warf.csv   RVM grids (rating x duration, bps)
+    coefficients.json           coefficients, R-squared, bond count and the workbook's sha256
+    bonds.feather               per-bond model outputs
+
+A directory is replaced in one step once all of its files are written, so readers never see a
+half-written result. A summary of the run is written to <output-dir>/manifest.json.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .ingest import read_excel_cached, file_sha256, atomic_write_json
+from .pipeline import RATING_NUM_MAP, RVM_DURATIONS, process_bonds, missing_columns, compute_rvm
+
+OUTPUT_FILES = {
+    'rvm_num': 'rvm_num.csv',
+    'rvm_warf': 'rvm_warf.csv',
+    'coefficients': 'coefficients.json',
+    'bonds': 'bonds.feather'
+}
+
+
+def output_path(output_dir, workbook):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(workbook))[0])
+
+
+def run_workbook(path, output_dir, sheet_name=0, rating_num_map=RATING_NUM_MAP, durations=RVM_DURATIONS):
+    """
+    Run the RVM pipeline on one workbook and write its outputs.
+
+    :return: Dict describing the run ('status' is 'ok', 'skipped' or 'error').
+    """
+    start = time.perf_counter()
+    record = {'workbook': os.path.abspath(path)}
+    try:
+        df = process_bonds(read_excel_cached(path, sheet_name), rating_num_map)
+        missing = missing_columns(df)
+        if missing:
+            record.update(status='skipped', reason=f"Missing columns: {', '.join(missing)}")
+            return record
+
+        results = compute_rvm(df, rating_num_map, durations)
+        target = output_path(output_dir, path)
+        write_outputs(results, target, {
+            'workbook': os.path.abspath(path),
+            'sha256': file_sha256(path),
+            'n_bonds': len(results['bonds'])
+        })
+        record.update(status='ok', output=target, n_bonds=len(results['bonds']))
+    except Exception as e:
+        record.update(status='error', reason=f"{type(e).__name__}: {e}")
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def write_outputs(results, target, metadata):
+    parent = os.path.dirname(target) or '.'
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(target)}.", suffix='.tmp')
+    os.chmod(tmp_dir, 0o755)
+
+    try:
+        results['rvm_num'].to_csv(os.path.join(tmp_dir, OUTPUT_FILES['rvm_num']))
+        results['rvm_warf'].to_csv(os.path.join(tmp_dir, OUTPUT_FILES['rvm_warf']))
+        results['bonds'].reset_index(drop=True).to_feather(os.path.join(tmp_dir, OUTPUT_FILES['bonds']))
+        with open(os.path.join(tmp_dir, OUTPUT_FILES['coefficients']), 'w') as f:
+            json.dump({
+                **metadata,
+                'coeffs_num': results['coeffs_num'],
+                'r2_num': results['r2_num'],
+                'coeffs_warf': results['coeffs_warf'],
+                'r2_warf': results['r2_warf']
+            }, f, indent=2)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Swap the finished directory in; the old one is only removed once the new one is in place
+    old_dir = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(target)}.", suffix='.old')
+    os.rmdir(old_dir)
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_outputs(target, workbook=None):
+    """
+    Read the outputs of run_workbook back.
+
+    :param target: Output directory of one workbook (see output_path).
+    :param workbook: Optional workbook path; if given, outputs computed from a different
+                     version of it are treated as missing.
+    :return: Dict shaped like pipeline.compute_rvm's result, or None if unavailable.
+    """
+    coefficients_path = os.path.join(target, OUTPUT_FILES['coefficients'])
+    if not os.path.exists(coefficients_path):
+        return None
+    with open(coefficients_path, 'r') as f:
+        metadata = json.load(f)
+    if workbook is not None and metadata.get('sha256') != file_sha256(workbook):
+        return None
+
+    grids = {}
+    for key in ['rvm_num', 'rvm_warf']:
+        grid = pd.read_csv(os.path.join(target, OUTPUT_FILES[key]), index_col=0)
+        grid.columns = pd.Index(pd.to_numeric(grid.columns), name='Duration')
+        grids[key] = grid
+
+    return {
+        **grids,
+        'coeffs_num': metadata['coeffs_num'],
+        'r2_num': metadata['r2_num'],
+        'coeffs_warf': metadata['coeffs_warf'],
+        'r2_warf': metadata['r2_warf'],
+        'bonds': pd.read_feather(os.path.join(target, OUTPUT_FILES['bonds']))
+    }
+
+
+def run_batch(workbooks, output_dir, max_workers=None, sheet_name=0):
+    """
+    Process many workbooks in parallel, one worker process per workbook at a time.
+
+    :return: List of run records (see run_workbook), in input order.
+    """
+    targets = [output_path(output_dir, path) for path in workbooks]
+    duplicates = sorted({target for target in targets if targets.count(target) > 1})
+    if duplicates:
+        raise ValueError(f"Workbooks would share output directories: {', '.join(duplicates)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = min(max_workers or os.cpu_count(), len(workbooks)) if workbooks else 1
+    records = [None] * len(workbooks)
+    if max_workers <= 1:
+        for i, path in enumerate(workbooks):
+            records[i] = run_workbook(path, output_dir, sheet_name)
+            print(_format_record(records[i]))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_workbook, path, output_dir, sheet_name): i
+                       for i, path in enumerate(workbooks)}
+            for future in as_completed(futures):
+                records[futures[future]] = future.result()
+                print(_format_record(records[futures[future]]))
+
+    atomic_write_json(os.path.join(output_dir, 'manifest.json'),
+                      {'finished': time.strftime('%Y-%m-%dT%H:%M:%S'), 'runs': records}, indent=2)
+    return records
+
+
+def _format_record(record):
+    detail = f"{record['n_bonds']} bonds" if record['status'] == 'ok' else record.get('reason', '')
+    return f"[{record['status']}] {record['workbook']} ({record['seconds']}s) {detail}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute RVM grids, coefficients and bond outputs for pricing workbooks.')
+    parser.add_argument('workbooks', nargs='+', help='Pricing workbooks (one per date or desk).')
+    parser.add_argument('--output-dir', default='rvm_outputs', help='Directory for the results (default: rvm_outputs).')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    parser.add_argument('--sheet', default=0, help='Sheet name or index (default: first sheet).')
+    args = parser.parse_args(argv)
+
+    sheet_name = int(args.sheet) if str(args.sheet).isdigit() else args.sheet
+    records = run_batch(args.workbooks, args.output_dir, args.workers, sheet_name)
+    return 0 if all(record['status'] == 'ok' for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
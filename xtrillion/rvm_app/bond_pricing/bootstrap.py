@@ -0,0 +1,183 @@
+# bond_pricing/bootstrap.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from .calculations import rvm_rating_values
+from .ols import fit_ols_stats
+
+COEFF_NAMES = ['intercept', 'coeff_ln_duration', 'coeff_rating']
+# Column layout of the bootstrap data matrix
+_COLUMNS = ['ln(duration)', 'rating_num', 'warf', 'ln(spread)']
+_MODEL_COLUMNS = {'Numerical': [0, 1], 'WARF': [0, 2]}
+# Largest batch when a time budget is set: a batch that has started always runs to the end
+BUDGET_BATCH_SIZE = 20
+
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _resample_counts(rng, n, n_replicates):
+    # Each row counts how often every bond is drawn in one resample of size n
+    draws = rng.integers(0, n, size=(n_replicates, n)) + (np.arange(n_replicates) * n)[:, np.newaxis]
+    return np.bincount(draws.ravel(), minlength=n_replicates * n).reshape(n_replicates, n).astype(float)
+
+
+def _replicate_coefficients(data, seed, n_replicates):
+    """
+    Fit both models on n_replicates bootstrap resamples.
+
+    A resample is a vector of draw counts, so the statistics of every replicate come from
+    one matrix product of the counts with the per-bond cross-products (data is pre-centred).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(data)
+    counts = _resample_counts(rng, n, n_replicates)
+
+    n_obs = counts.sum(axis=1)
+    means = counts @ data / n_obs[:, np.newaxis]
+    second = np.einsum('bn,ni,nj->bij', counts, data, data, optimize=True)
+    centred = second - n_obs[:, np.newaxis, np.newaxis] * means[:, :, np.newaxis] * means[:, np.newaxis, :]
+
+    results = {}
+    for model_type, columns in _MODEL_COLUMNS.items():
+        stats = {
+            'n': n_obs,
+            'x_mean': means[:, columns],
+            'y_mean': means[:, 3],
+            'cxx': centred[:, columns][:, :, columns],
+            'cxy': centred[:, columns, 3],
+            'cyy': centred[:, 3, 3],
+        }
+        intercept, coef, _ = fit_ols_stats(stats)
+        results[model_type] = np.column_stack([intercept, coef])
+    return results
+
+
+def _run_task(seed, n_replicates):
+    return _replicate_coefficients(_worker_data, seed, n_replicates)
+
+
+def bootstrap_regressions(df_num, n_boot=2000, seed=0, max_workers=None, time_budget=None,
+                          batch_size=100, ci=0.95):
+    """
+    Bootstrap the Numerical and WARF regressions by resampling bonds with replacement.
+
+    Replicates are split into batches of `batch_size`. Each batch gets a child seed from
+    np.random.SeedSequence(seed), so results depend only on the seed and on how many
+    batches finish, not on worker scheduling.
+
+    :param df_num: Bond DataFrame with 'ln(duration)', 'rating_num', 'warf' and 'ln(spread)'.
+    :param n_boot: Number of bootstrap replicates requested.
+    :param max_workers: Process pool size (default: CPU count); 0 or 1 runs in-process.
+    :param time_budget: Optional wall-clock limit in seconds. Batches still running when it
+                        expires are dropped, and only the completed leading batches are used.
+                        The call returns at the deadline, but a batch already running in a
+                        worker cannot be interrupted and finishes in the background, so
+                        batch_size is capped at BUDGET_BATCH_SIZE to keep that overrun short.
+    :param ci: Confidence level of the intervals.
+    :return: Dict with 'n_boot' (replicates actually used), 'ci', the replicate coefficient
+             arrays 'replicates_num'/'replicates_warf' and the interval tables 'coeffs_num'/'coeffs_warf'.
+    """
+    data = df_num[_COLUMNS].to_numpy(dtype=float)
+    data = data[np.isfinite(data).all(axis=1)]
+    # Centring once keeps the per-replicate raw cross-products well conditioned
+    offset = data.mean(axis=0)
+    centred_data = data - offset
+
+    if time_budget is not None:
+        batch_size = min(batch_size, BUDGET_BATCH_SIZE)
+    n_batches = -(-n_boot // batch_size)
+    batch_sizes = [min(batch_size, n_boot - i * batch_size) for i in range(n_batches)]
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    results = [None] * n_batches
+    max_workers = os.cpu_count() if max_workers is None else max_workers
+    if max_workers <= 1:
+        for i in range(n_batches):
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            results[i] = _replicate_coefficients(centred_data, seeds[i], batch_sizes[i])
+    else:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                       initargs=(centred_data,))
+        try:
+            futures = {executor.submit(_run_task, seeds[i], batch_sizes[i]): i for i in range(n_batches)}
+            pending = set(futures)
+            while pending:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future]] = future.result()
+                if not done:
+                    break
+        finally:
+            # Cancels the queued batches only; running ones complete and their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    completed = []
+    for result in results:
+        if result is None:
+            break
+        completed.append(result)
+    if not completed:
+        raise TimeoutError("No bootstrap batch finished within the time budget.")
+
+    output = {'n_boot': 0, 'ci': ci}
+    for model_type, suffix in [('Numerical', 'num'), ('WARF', 'warf')]:
+        replicates = np.concatenate([result[model_type] for result in completed])
+        # Undo the centring: only the intercept depends on the offsets
+        columns = _MODEL_COLUMNS[model_type]
+        replicates[:, 0] += offset[3] - replicates[:, 1:] @ offset[columns]
+        output[f'replicates_{suffix}'] = replicates
+        output[f'coeffs_{suffix}'] = _interval_table(replicates, ci)
+        output['n_boot'] = len(replicates)
+    return output
+
+
+def _interval_table(replicates, ci):
+    alpha = (1 - ci) / 2
+    return pd.DataFrame({
+        'lower': np.nanquantile(replicates, alpha, axis=0),
+        'upper': np.nanquantile(replicates, 1 - alpha, axis=0),
+        'std': np.nanstd(replicates, axis=0),
+    }, index=COEFF_NAMES)
+
+
+def bootstrap_rvm_grid(replicates, ratings, durations, model_type, warf_map, rating_num_map=None, ci=0.95):
+    """
+    Confidence bands for every cell of an RVM grid from bootstrap coefficient replicates.
+
+    :return: Tuple (lower, upper) DataFrames laid out like create_rvm_grid.
+    """
+    rating_values = rvm_rating_values(ratings, model_type, warf_map, rating_num_map).dropna().sort_index()
+    durations = np.sort(np.asarray(durations))
+    ln_spread = (replicates[:, 0, np.newaxis, np.newaxis]
+                 + replicates[:, 2, np.newaxis, np.newaxis] * rating_values.to_numpy()[np.newaxis, :, np.newaxis]
+                 + replicates[:, 1, np.newaxis, np.newaxis] * np.log(durations.astype(float))[np.newaxis, np.newaxis, :])
+    alpha = (1 - ci) / 2
+    lower, upper = np.exp(np.nanquantile(ln_spread, [alpha, 1 - alpha], axis=0))
+
+    index = rating_values.index
+    columns = pd.Index(durations, name='Duration')
+    return pd.DataFrame(lower, index=index, columns=columns), pd.DataFrame(upper, index=index, columns=columns)
+
+
+def bootstrap_rvm_grids(boot, ratings_order, durations, warf_map, rating_num_map=None):
+    """
+    :param boot: Result of bootstrap_regressions.
+    :return: Tuple (lower_num, upper_num, lower_warf, upper_warf) grid DataFrames.
+    """
+    lower_num, upper_num = bootstrap_rvm_grid(boot['replicates_num'], ratings_order, durations, 'Numerical',
+                                              warf_map, rating_num_map, boot['ci'])
+    lower_warf, upper_warf = bootstrap_rvm_grid(boot['replicates_warf'], ratings_order, durations, 'WARF',
+                                                warf_map, rating_num_map, boot['ci'])
+    return lower_num, upper_num, lower_warf, upper_warf
@@ -1,39 +1,82 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
+from .ols import fit_ols, fit_ols_batch
+
+MODEL_FEATURES = {
+    'Numerical': ['ln(duration)', 'rating_num'],
+    'WARF': ['ln(duration)', 'warf'],
+}
+
+def warf_to_rating_nums(warf_values, warf_map_sorted):
+    """
+    Interpolate rating numbers for a whole array of WARF values at once.
+
+    :param warf_values: Array-like (or Series) of WARF values.
+    :param warf_map_sorted: DataFrame with 'warf' and 'rating_num' columns, sorted by 'warf'.
+    :return: Array of interpolated rating numbers, clamped to the first/last rating
+             outside the WARF range. A Series input returns a Series on the same index.
+    """
+    warfs = warf_map_sorted['warf'].to_numpy(dtype=float)
+    rating_nums = warf_map_sorted['rating_num'].to_numpy(dtype=float)
+    values = np.asarray(warf_values, dtype=float)
+
+    # upper[i] is the first breakpoint with warf > value, lower[i] the last with warf <= value
+    upper = np.clip(np.searchsorted(warfs, values, side='right'), 1, max(len(warfs) - 1, 1))
+    lower = upper - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (values - warfs[lower]) / (warfs[upper] - warfs[lower])
+        result = rating_nums[lower] + fraction * (rating_nums[upper] - rating_nums[lower])
+    result = np.where(values <= warfs[0], rating_nums[0], result)
+    result = np.where(values >= warfs[-1], rating_nums[-1], result)
+
+    if isinstance(warf_values, pd.Series):
+        return pd.Series(result, index=warf_values.index, name=warf_values.name)
+    return result
 
 def warf_to_rating_num(warf_value, warf_map_sorted):
-    if warf_value <= warf_map_sorted['warf'].min():
-        return warf_map_sorted.iloc[0]['rating_num']
-    elif warf_value >= warf_map_sorted['warf'].max():
-        return warf_map_sorted.iloc[-1]['rating_num']
-    else:
-        lower = warf_map_sorted[warf_map_sorted['warf'] <= warf_value].iloc[-1]
-        upper = warf_map_sorted[warf_map_sorted['warf'] > warf_value].iloc[0]
-        fraction = (warf_value - lower['warf']) / (upper['warf'] - lower['warf'])
-        return lower['rating_num'] + fraction * (upper['rating_num'] - lower['rating_num'])
+    return warf_to_rating_nums(np.array([warf_value]), warf_map_sorted)[0]
 
-def perform_regression(df, model_type, warf_map_sorted=None):
-    if model_type == 'Numerical':
-        X = df[['ln(duration)', 'rating_num']]
-        y = df['ln(spread)']
-    elif model_type == 'WARF':
-        X = df[['ln(duration)', 'warf']]
-        y = df['ln(spread)']
-    else:
+def _model_features(model_type):
+    if model_type not in MODEL_FEATURES:
         raise ValueError("Invalid model_type. Choose 'Numerical' or 'WARF'.")
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    intercept = model.intercept_
-    coeff_ln_duration, coeff_rating = model.coef_
-    
-    if model_type == 'Numerical':
-        df['ln(spread)_predicted'] = intercept + coeff_ln_duration * df['ln(duration)'] + coeff_rating * df['rating_num']
+    return MODEL_FEATURES[model_type]
+
+def _coeffs_dict(intercept, coef):
+    coeff_ln_duration, coeff_rating = coef
+    return {
+        'intercept': float(intercept),
+        'coeff_ln_duration': float(coeff_ln_duration),
+        'coeff_rating': float(coeff_rating)
+    }
+
+def fit_regression(df, model_type, solver='ols'):
+    """
+    Fit ln(spread) ~ ln(duration) + rating term for one model type.
+
+    :param solver: 'ols' for the closed-form numpy solver, 'sklearn' for LinearRegression.
+    :return: Tuple (coeffs dict, r2).
+    """
+    X = df[_model_features(model_type)]
+    y = df['ln(spread)']
+
+    if solver == 'ols':
+        intercept, coef, r2 = fit_ols(X, y)
+    elif solver == 'sklearn':
+        from sklearn.linear_model import LinearRegression
+        model = LinearRegression().fit(X, y)
+        intercept, coef, r2 = model.intercept_, model.coef_, model.score(X, y)
     else:
-        df['ln(spread)_predicted'] = intercept + coeff_ln_duration * df['ln(duration)'] + coeff_rating * df['warf']
-    
+        raise ValueError("Invalid solver. Choose 'ols' or 'sklearn'.")
+
+    return _coeffs_dict(intercept, coef), r2
+
+def apply_regression(df, model_type, coeffs, warf_map_sorted=None):
+    intercept = coeffs['intercept']
+    coeff_ln_duration = coeffs['coeff_ln_duration']
+    coeff_rating = coeffs['coeff_rating']
+    rating_column = _model_features(model_type)[1]
+
+    df['ln(spread)_predicted'] = intercept + coeff_ln_duration * df['ln(duration)'] + coeff_rating * df[rating_column]
     df['spread_predicted'] = np.exp(df['ln(spread)_predicted'])
     df['Return'] = (df['OAS'] - df['spread_predicted']) * df['OAD']
     df['Return_YTW'] = df['Return'] + df['YTW']
@@ -43,52 +86,85 @@ def perform_regression(df, model_type, warf_map_sorted=None):
         df['Notches'] = df['rating_num'] - df['Rating Num Implied']
     else:
         df['WARF Implied'] = (df['ln(spread)'] - intercept - coeff_ln_duration * df['ln(duration)']) / coeff_rating
-        df['Rating Num Implied'] = df['WARF Implied'].apply(lambda x: warf_to_rating_num(x, warf_map_sorted))
+        df['Rating Num Implied'] = warf_to_rating_nums(df['WARF Implied'], warf_map_sorted)
         df['Notches'] = df['rating_num'] - df['Rating Num Implied']
     
-    coeffs = {
-        'intercept': intercept,
-        'coeff_ln_duration': coeff_ln_duration,
-        'coeff_rating': coeff_rating
-    }
-    
-    r2 = model.score(X, y)
-    
+    return df
+
+def perform_regression(df, model_type, warf_map_sorted=None, solver='ols'):
+    coeffs, r2 = fit_regression(df, model_type, solver)
+    df = apply_regression(df, model_type, coeffs, warf_map_sorted)
     return df, coeffs, r2
 
-def perform_regressions(df_num, warf_map_sorted):
-    df_num, coeffs_num, r2_num = perform_regression(df_num, 'Numerical')
-    df_warf, coeffs_warf, r2_warf = perform_regression(df_num, 'WARF', warf_map_sorted)
+def perform_regressions(df_num, warf_map_sorted, solver='ols'):
+    if solver == 'ols':
+        # Numerical and WARF share y and ln(duration): fit both as one stacked batch
+        X = np.stack([df_num[MODEL_FEATURES['Numerical']].to_numpy(dtype=float),
+                      df_num[MODEL_FEATURES['WARF']].to_numpy(dtype=float)])
+        y = np.broadcast_to(df_num['ln(spread)'].to_numpy(dtype=float), X.shape[:2])
+        intercepts, coefs, r2s = fit_ols_batch(X, y)
+        coeffs_num, r2_num = _coeffs_dict(intercepts[0], coefs[0]), float(r2s[0])
+        coeffs_warf, r2_warf = _coeffs_dict(intercepts[1], coefs[1]), float(r2s[1])
+    else:
+        coeffs_num, r2_num = fit_regression(df_num, 'Numerical', solver)
+        coeffs_warf, r2_warf = fit_regression(df_num, 'WARF', solver)
+
+    df_num = apply_regression(df_num, 'Numerical', coeffs_num)
+    df_warf = apply_regression(df_num, 'WARF', coeffs_warf, warf_map_sorted)
     return df_num, coeffs_num, r2_num, df_warf, coeffs_warf, r2_warf
 
+def rvm_rating_values(ratings, model_type, warf_map, rating_num_map=None):
+    """
+    Resolve the model's rating regressor (rating_num or warf) for each rating label.
+
+    :return: Series indexed by rating label; NaN where the rating cannot be resolved.
+    """
+    ratings = pd.Index(ratings, name='Rating')
+    if model_type == 'Numerical':
+        if rating_num_map:
+            rating_values = ratings.map(rating_num_map).to_numpy(dtype=float)
+        else:
+            # No explicit numbering: rank the WARF breakpoints and interpolate every rating at once
+            warf_map_sorted = pd.DataFrame(warf_map.items(), columns=['rating', 'warf']).dropna().sort_values('warf')
+            warf_map_sorted['rating_num'] = np.arange(1, len(warf_map_sorted) + 1)
+            rating_values = warf_to_rating_nums(ratings.map(warf_map).to_numpy(dtype=float), warf_map_sorted)
+    elif model_type == 'WARF':
+        rating_values = ratings.map(warf_map).to_numpy(dtype=float)
+    else:
+        raise ValueError("Invalid model_type. Choose 'Numerical' or 'WARF'.")
+    return pd.Series(rating_values, index=ratings)
+
+def create_rvm_mesh(rating_values, durations, coeffs):
+    """
+    Evaluate the fitted model over the full rating x duration mesh in one broadcast.
+
+    Axes can be arbitrarily dense, e.g. np.arange(0.1, 30.05, 0.1) for durations and
+    fractional notches such as np.arange(1, 21.01, 0.25) for ratings.
+
+    :param rating_values: Series of rating regressor values (index gives row labels) or a plain array.
+    :param durations: Durations in years (must be positive).
+    :param coeffs: Dict with 'intercept', 'coeff_ln_duration' and 'coeff_rating'.
+    :return: DataFrame of predicted spreads, rows 'Rating' and columns 'Duration'.
+    """
+    if isinstance(rating_values, pd.Series):
+        index = rating_values.index
+    else:
+        index = pd.Index(rating_values, name='Rating')
+    rating_values = np.asarray(rating_values, dtype=float)
+    durations = np.asarray(durations)
+
+    ln_spread = (coeffs['intercept']
+                 + coeffs['coeff_rating'] * rating_values[:, np.newaxis]
+                 + coeffs['coeff_ln_duration'] * np.log(durations.astype(float))[np.newaxis, :])
+
+    return pd.DataFrame(np.exp(ln_spread), index=index.rename('Rating'),
+                        columns=pd.Index(durations, name='Duration'))
+
 def create_rvm_grid(ratings, durations, model_type, coeffs, warf_map, rating_num_map=None):
-    grid_data = []
-    for rating in ratings:
-        if model_type == 'Numerical':
-            if rating_num_map:
-                rating_num = rating_num_map.get(rating, np.nan)
-            else:
-                rating_num = warf_to_rating_num(warf_map[rating], pd.DataFrame(warf_map.items(), columns=['rating', 'warf']))
-            if pd.isna(rating_num):
-                continue
-            for duration in durations:
-                ln_duration = np.log(duration)
-                predicted_ln_spread = coeffs['intercept'] + coeffs['coeff_ln_duration'] * ln_duration + coeffs['coeff_rating'] * rating_num
-                spread_predicted = np.exp(predicted_ln_spread)
-                grid_data.append({'Rating': rating, 'Duration': duration, 'Predicted Spread': spread_predicted})
-        elif model_type == 'WARF':
-            warf = warf_map.get(rating, np.nan)
-            if pd.isna(warf):
-                continue
-            for duration in durations:
-                ln_duration = np.log(duration)
-                predicted_ln_spread = coeffs['intercept'] + coeffs['coeff_ln_duration'] * ln_duration + coeffs['coeff_rating'] * warf
-                spread_predicted = np.exp(predicted_ln_spread)
-                grid_data.append({'Rating': rating, 'Duration': duration, 'Predicted Spread': spread_predicted})
-    
-    rvm_df = pd.DataFrame(grid_data)
-    rvm_pivot = rvm_df.pivot(index='Rating', columns='Duration', values='Predicted Spread')
-    return rvm_pivot
+    rating_values = rvm_rating_values(ratings, model_type, warf_map, rating_num_map).dropna()
+    rvm_pivot = create_rvm_mesh(rating_values, durations, coeffs)
+    # Same ordering as the previous long-format pivot: ratings and durations sorted
+    return rvm_pivot.sort_index().sort_index(axis=1)
 
 def create_rvm_grids(ratings_order, durations, coeffs_num, coeffs_warf, warf_map, rating_num_map=None):
     rvm_num = create_rvm_grid(ratings_order, durations, 'Numerical', coeffs_num, warf_map, rating_num_map)
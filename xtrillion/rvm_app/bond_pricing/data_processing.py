@@ -1,6 +1,127 @@
 # bond_pricing/data_processing.py
 import pandas as pd
+import numpy as np
 import os
+import threading
+
+class IsinIndex:
+    """
+    ISIN-keyed table with hash-index lookups and upserts.
+
+    Rows are stored once, indexed by ISIN (duplicates keep the first row), so lookups
+    and membership tests do not scan or merge the whole table.
+    """
+
+    def __init__(self, df=None, key='ISIN'):
+        self.key = key
+        if df is None:
+            df = pd.DataFrame(columns=[key])
+        self._data = df.drop_duplicates(subset=[key], keep='first').set_index(key)
+
+    def __contains__(self, isin):
+        return isin in self._data.index
+
+    def __len__(self):
+        return len(self._data)
+
+    def lookup(self, isins):
+        """
+        :param isins: Sequence of ISINs.
+        :return: DataFrame aligned with isins (one row each, NaN where the ISIN is unknown).
+        """
+        return self._data.reindex(pd.Index(isins, name=self.key))
+
+    def upsert(self, df, overwrite=True):
+        """
+        Add rows for new ISINs; rows for known ISINs replace the stored ones if overwrite is True.
+        """
+        rows = df.drop_duplicates(subset=[self.key], keep='first').set_index(self.key)
+        # get_indexer probes the stored index's cached hash table; Index.isin would rebuild one from all rows
+        known = self._data.index.get_indexer(rows.index) != -1
+        if overwrite and known.any():
+            self._data = self._data.drop(index=rows.index[known])
+        else:
+            rows = rows[~known]
+        if len(rows):
+            self._data = pd.concat([self._data, rows])
+
+    def union_frame(self, df):
+        """
+        Stored rows plus the rows of df for ISINs not stored yet, as a new frame; the index is
+        left unchanged, so a shared index can serve many uploads.
+        """
+        rows = df.drop_duplicates(subset=[self.key], keep='first')
+        new_rows = rows[self._data.index.get_indexer(pd.Index(rows[self.key])) == -1]
+        return pd.concat([self.frame, new_rows], ignore_index=True)
+
+    @property
+    def frame(self):
+        return self._data.reset_index()
+
+
+class IsinMaster(IsinIndex):
+    """
+    Reference data for ISIN enrichment, loaded once from CSV and reloaded only when the
+    file's modification time changes. Upserted bonds are kept across reloads.
+    """
+
+    def __init__(self, path, key='ISIN'):
+        super().__init__(key=key)
+        self.path = path
+        self._mtime = None
+        self._upserts = IsinIndex(key=key)
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                self._data = pd.read_csv(self.path).drop_duplicates(subset=[self.key], keep='first').set_index(self.key)
+                self._mtime = mtime
+                if len(self._upserts):
+                    super().upsert(self._upserts.frame)
+
+    def lookup(self, isins):
+        self.refresh()
+        return super().lookup(isins)
+
+    def upsert(self, df, overwrite=True):
+        with self._lock:
+            self._upserts.upsert(df, overwrite)
+            super().upsert(df, overwrite)
+
+    def enrich(self, uploaded_df):
+        """
+        Left-join the reference columns onto uploaded_df by ISIN (same result as a
+        merge on 'ISIN', including _x/_y suffixes for overlapping columns).
+
+        :return: Tuple (enriched DataFrame, number of ISINs that could not be mapped).
+        """
+        self.refresh()
+        data = self._data
+        isins = pd.Index(uploaded_df[self.key], name=self.key)
+        unmapped = int((data.index.get_indexer(isins) == -1).sum())
+        reference = data.reindex(isins)
+
+        overlap = [col for col in reference.columns if col in uploaded_df.columns]
+        left = uploaded_df.reset_index(drop=True).rename(columns={col: f"{col}_x" for col in overlap})
+        right = reference.reset_index(drop=True).rename(columns={col: f"{col}_y" for col in overlap})
+        return pd.concat([left, right], axis=1), unmapped
+
+
+_isin_masters = {}
+_isin_masters_lock = threading.Lock()
+
+def get_isin_master(extended_data_path):
+    """
+    :return: The shared IsinMaster for a reference file, created on first use.
+    """
+    path = os.path.abspath(extended_data_path)
+    with _isin_masters_lock:
+        if path not in _isin_masters:
+            _isin_masters[path] = IsinMaster(path)
+        return _isin_masters[path]
 
 def map_isin(uploaded_df, extended_data_path='bond_pricing/extended_bond_data.csv'):
     """
@@ -12,16 +133,11 @@ def map_isin(uploaded_df, extended_data_path='bond_pricing/extended_bond_data.cs
     """
     if os.path.exists(extended_data_path):
         try:
-            extended_data = pd.read_csv(extended_data_path)
-            df_merged = uploaded_df.merge(extended_data, on='ISIN', how='left', indicator=True)
-            
-            # Identify and warn about ISINs that couldn't be mapped
-            missing_isin = df_merged[df_merged['_merge'] == 'left_only']
-            if not missing_isin.empty:
-                print(f"Warning: {missing_isin.shape[0]} ISIN(s) could not be mapped to extended data.")
+            df_merged, unmapped = get_isin_master(extended_data_path).enrich(uploaded_df)
             
-            # Drop the merge indicator column
-            df_merged = df_merged.drop(columns=['_merge'])
+            # Warn about ISINs that couldn't be mapped
+            if unmapped:
+                print(f"Warning: {unmapped} ISIN(s) could not be mapped to extended data.")
             
             return df_merged
         except Exception as e:
@@ -32,3 +148,23 @@ def map_isin(uploaded_df, extended_data_path='bond_pricing/extended_bond_data.cs
         print(f"Extended data file not found at {extended_data_path}")
         print("Proceeding with original data.")
         return uploaded_df
+
+def add_model_columns(df, rating_num_map):
+    """
+    Add the regression inputs used by the RVM models.
+
+    :param df: DataFrame with 'OAD', 'OAS' and either 'Rating' or 'Index Rating (String)'.
+    :param rating_num_map: Dictionary mapping ratings (e.g. 'Baa2') to rating numbers.
+    :return: The DataFrame with 'Rating', 'rating_num', 'ln(duration)' and 'ln(spread)' columns.
+    """
+    if 'Rating' not in df.columns and 'Index Rating (String)' in df.columns:
+        # Same as utils.get_rating_from_string, applied to the whole column
+        df['Rating'] = df['Index Rating (String)'].str.split().str[0]
+
+    df['Rating'] = df['Rating'].astype(object).apply(lambda x: x.capitalize() if isinstance(x, str) else x)
+    df['rating_num'] = df['Rating'].map(rating_num_map)
+    # Logs in full precision even when OAD/OAS are stored as float32
+    df['ln(duration)'] = np.log(df['OAD'].astype(float))
+    df['ln(spread)'] = np.log(df['OAS'].astype(float))
+
+    return df
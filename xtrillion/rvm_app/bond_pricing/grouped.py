@@ -0,0 +1,95 @@
+# bond_pricing/grouped.py
+import numpy as np
+import pandas as pd
+
+from .calculations import MODEL_FEATURES, create_rvm_grid
+from .ols import fit_ols_stats
+
+GROUP_FIT_COLUMNS = ['n_bonds', 'intercept', 'coeff_ln_duration', 'coeff_rating', 'r2']
+
+
+def grouped_ols_stats(df, group_cols, features, target='ln(spread)'):
+    """
+    Build the OLS sufficient statistics of every group in one vectorized pass.
+
+    Rows are factorized into group codes once, and the per-group means and centred
+    cross-products are accumulated with np.bincount rather than a Python loop.
+    Rows with missing group keys or non-finite regressors are left out.
+
+    :return: Tuple (group index, batched statistics dict as produced by ols.ols_stats).
+    """
+    group_cols = [group_cols] if isinstance(group_cols, str) else list(group_cols)
+    values = df[features + [target]].to_numpy(dtype=float)
+    keep = df[group_cols].notna().all(axis=1).to_numpy() & np.isfinite(values).all(axis=1)
+    codes, keys = pd.MultiIndex.from_frame(df.loc[keep, group_cols]).factorize(sort=True)
+    values = values[keep]
+
+    n_groups = len(keys)
+    counts = np.bincount(codes, minlength=n_groups).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.stack([np.bincount(codes, weights=values[:, j], minlength=n_groups)
+                          for j in range(values.shape[1])], axis=1) / counts[:, np.newaxis]
+    centred = values - means[codes]
+
+    m = values.shape[1]
+    comoments = np.empty((n_groups, m, m))
+    for i in range(m):
+        for j in range(i, m):
+            comoments[:, i, j] = comoments[:, j, i] = np.bincount(
+                codes, weights=centred[:, i] * centred[:, j], minlength=n_groups)
+
+    k = len(features)
+    stats = {
+        'n': counts,
+        'x_mean': np.nan_to_num(means[:, :k]),
+        'y_mean': np.nan_to_num(means[:, k]),
+        'cxx': comoments[:, :k, :k],
+        'cxy': comoments[:, :k, k],
+        'cyy': comoments[:, k, k],
+    }
+    index = keys if len(group_cols) > 1 else pd.Index(keys.get_level_values(0), name=group_cols[0])
+    if isinstance(index, pd.MultiIndex):
+        index = index.set_names(group_cols)
+    return index, stats
+
+
+def perform_grouped_regression(df, group_cols, model_type='Numerical', min_bonds=10):
+    """
+    Fit a separate spread vs duration/rating curve for each group (e.g. Country, Ccy, sector).
+
+    :param df: Processed bond DataFrame (see rvm_app.process_data).
+    :param group_cols: Column name or list of column names defining the groups.
+    :param model_type: 'Numerical' or 'WARF'.
+    :param min_bonds: Groups with fewer bonds get NaN coefficients and R².
+    :return: DataFrame indexed by group with n_bonds, intercept, coeff_ln_duration, coeff_rating and r2.
+    """
+    if model_type not in MODEL_FEATURES:
+        raise ValueError("Invalid model_type. Choose 'Numerical' or 'WARF'.")
+    index, stats = grouped_ols_stats(df, group_cols, MODEL_FEATURES[model_type])
+    intercept, coef, r2 = fit_ols_stats(stats, min_obs=min_bonds)
+
+    return pd.DataFrame({
+        'n_bonds': stats['n'].astype(int),
+        'intercept': intercept,
+        'coeff_ln_duration': coef[:, 0],
+        'coeff_rating': coef[:, 1],
+        'r2': r2,
+    }, index=index, columns=GROUP_FIT_COLUMNS)
+
+
+def create_group_rvm_grid(group_fits, group, ratings, durations, model_type, warf_map, rating_num_map=None):
+    """
+    Build the RVM grid of a single group from a perform_grouped_regression table.
+
+    :param group: Group key (a tuple when grouping by several columns).
+    :return: RVM pivot as returned by create_rvm_grid, or None if the group has no valid fit.
+    """
+    row = group_fits.loc[group]
+    if pd.isna(row['intercept']):
+        return None
+    coeffs = {
+        'intercept': row['intercept'],
+        'coeff_ln_duration': row['coeff_ln_duration'],
+        'coeff_rating': row['coeff_rating']
+    }
+    return create_rvm_grid(ratings, durations, model_type, coeffs, warf_map, rating_num_map)
@@ -0,0 +1,120 @@
+# bond_pricing/incremental.py
+import numpy as np
+import pandas as pd
+
+from .calculations import MODEL_FEATURES, apply_regression, _coeffs_dict
+from .ols import ols_stats, merge_ols_stats, subtract_ols_stats, fit_ols_stats
+
+MODEL_TYPES = ['Numerical', 'WARF']
+
+
+class IncrementalRVM:
+    """
+    Numerical and WARF regressions that can be updated bond by bond.
+
+    Keeps the sufficient statistics of both models (counts, means, centred
+    cross-products; see ols.ols_stats) so adding, removing or replacing k bonds
+    costs O(k) instead of refitting the whole universe. The outputs are the same
+    as perform_regressions on the current universe.
+
+    Added rows are queued as chunks and removals only update the ISIN set; the
+    universe frame (bonds) is consolidated in one O(n) pass on first access
+    after a change.
+
+    Bonds are keyed by ISIN; for duplicate ISINs the first row is kept.
+    Bonds whose regressors are missing or non-finite are kept in the universe
+    but are left out of the fit.
+    """
+
+    def __init__(self, df, warf_map_sorted, key='ISIN'):
+        self.warf_map_sorted = warf_map_sorted
+        self.key = key
+        bonds = df.drop_duplicates(subset=[key], keep='first').set_index(key, drop=False)
+        self._chunks = [bonds]
+        self.isins = set(bonds.index)
+        self._fitted = {}
+        self._stats = self._rows_stats(bonds)
+        self._fit = None
+
+    @property
+    def bonds(self):
+        """The current universe, indexed by ISIN. Later chunks win for ISINs that were replaced."""
+        if len(self._chunks) > 1 or len(self._chunks[0]) != len(self.isins):
+            bonds = pd.concat(self._chunks)
+            keep = bonds.index.isin(list(self.isins)) & ~bonds.index.duplicated(keep='last')
+            self._chunks = [bonds[keep]]
+        return self._chunks[0]
+
+    def _model_rows(self, df):
+        """Regressor/target arrays of the rows that can enter the fit, keyed by ISIN."""
+        columns = list(dict.fromkeys(MODEL_FEATURES['Numerical'] + MODEL_FEATURES['WARF'])) + ['ln(spread)']
+        values = df[columns].to_numpy(dtype=float)
+        finite = np.isfinite(values).all(axis=1)
+        return df.index[finite], values[finite]
+
+    def _rows_stats(self, df):
+        isins, values = self._model_rows(df)
+        self._fitted.update(zip(isins, values))
+        return self._values_stats(values)
+
+    @staticmethod
+    def _values_stats(values):
+        # Column layout of _model_rows: ln(duration), rating_num, warf, ln(spread)
+        designs = {'Numerical': values[:, [0, 1]], 'WARF': values[:, [0, 2]]}
+        per_model = [ols_stats(designs[model_type], values[:, 3]) for model_type in MODEL_TYPES]
+        return {name: np.stack([np.asarray(stats[name]) for stats in per_model]) for name in per_model[0]}
+
+    def _discard(self, isins):
+        removed = [self._fitted.pop(isin) for isin in isins if isin in self._fitted]
+        if removed:
+            self._stats = subtract_ols_stats(self._stats, self._values_stats(np.array(removed)))
+
+    def add(self, df):
+        """Add new bonds; raises ValueError if any ISIN is already in the universe."""
+        new = df.drop_duplicates(subset=[self.key], keep='first').set_index(self.key, drop=False)
+        existing = [isin for isin in new.index if isin in self.isins]
+        if existing:
+            raise ValueError(f"ISIN(s) already in the model: {', '.join(map(str, existing[:5]))}")
+        self._stats = merge_ols_stats(self._stats, self._rows_stats(new))
+        self._chunks.append(new)
+        self.isins.update(new.index)
+        self._fit = None
+
+    def remove(self, isins):
+        """Remove bonds by ISIN; unknown ISINs are ignored."""
+        isins = [isin for isin in dict.fromkeys(isins) if isin in self.isins]
+        self._discard(isins)
+        self.isins.difference_update(isins)
+        self._fit = None
+
+    def replace(self, df):
+        """Upsert bonds: rows for known ISINs (e.g. updated prices) replace the old ones, new ISINs are added."""
+        new = df.drop_duplicates(subset=[self.key], keep='first').set_index(self.key, drop=False)
+        self.remove(new.index)
+        self.add(new)
+
+    def refit(self):
+        """Rebuild the statistics from the stored bonds (clears any drift after many removals)."""
+        self._fitted = {}
+        self._stats = self._rows_stats(self.bonds)
+        self._fit = None
+
+    def fit(self):
+        """
+        :return: Tuple (coeffs_num, r2_num, coeffs_warf, r2_warf) for the current universe.
+        """
+        if self._fit is None:
+            intercepts, coefs, r2s = fit_ols_stats(self._stats)
+            self._fit = (_coeffs_dict(intercepts[0], coefs[0]), float(r2s[0]),
+                         _coeffs_dict(intercepts[1], coefs[1]), float(r2s[1]))
+        return self._fit
+
+    def score(self, df):
+        """Apply the current coefficients to any frame (processed as in rvm_app.process_data) without adding it."""
+        coeffs_num, _, coeffs_warf, _ = self.fit()
+        df = apply_regression(df, 'Numerical', coeffs_num)
+        return apply_regression(df, 'WARF', coeffs_warf, self.warf_map_sorted)
+
+    def frame(self):
+        """:return: The current universe with Notches, Return_YTW and the other model outputs refreshed."""
+        return self.score(self.bonds.reset_index(drop=True))
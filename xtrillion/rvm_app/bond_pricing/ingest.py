@@ -0,0 +1,239 @@
+# bond_pricing/ingest.py
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .data_processing import add_model_columns
+from .schema import coerce_bond_frame
+
+CACHE_DIR_NAME = '.rvm_cache'
+STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+# pandas' default na_values (pandas._libs.parsers.STR_NA_VALUES), which pd.read_excel reads as NaN
+EXCEL_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_excel_chunks(path, chunksize=50_000, sheet_name=0, rating_num_map=None):
+    """
+    Stream an .xlsx sheet in read-only row mode as typed DataFrame chunks.
+
+    Only one chunk of rows is materialised at a time. Headers and missing values are read
+    as pd.read_excel reads them: a repeated header becomes 'Notes.1', 'Notes.2', ... and
+    the default na_values ('#N/A', 'n/a', ...) become NaN. Each chunk is coerced to the
+    bond schema and, if rating_num_map is given, gets rating_num, ln(duration) and
+    ln(spread), so the chunks can go straight into
+    streaming.fit_streaming_regression while the workbook is still being read.
+
+    :param path: Path or file-like object of an .xlsx workbook.
+    :param sheet_name: Sheet index or name.
+    :return: Generator of DataFrames.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _dedup_columns([col if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)])
+
+        buffer = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield _typed_chunk(buffer, columns, rating_num_map)
+                buffer = []
+        if buffer:
+            yield _typed_chunk(buffer, columns, rating_num_map)
+    finally:
+        workbook.close()
+
+
+def _dedup_columns(columns):
+    # Same renaming as pd.read_excel: the second 'Notes' becomes 'Notes.1', skipping names in the header
+    header = set(columns)
+    counts = {}
+    deduped = []
+    for col in columns:
+        count = counts.get(col, 0)
+        name = col
+        while count > 0:
+            counts[col] = count + 1
+            name = f"{col}.{count}"
+            count = count + 1 if name in header else counts.get(name, 0)
+        deduped.append(name)
+        counts[name] = count + 1
+    return deduped
+
+
+def _typed_chunk(rows, columns, rating_num_map):
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    for col in chunk.columns:
+        if pd.api.types.is_object_dtype(chunk[col]) or pd.api.types.is_string_dtype(chunk[col]):
+            chunk[col] = chunk[col].mask(chunk[col].isin(EXCEL_NA_VALUES))
+    chunk = chunk.infer_objects()
+    if rating_num_map is not None:
+        chunk = add_model_columns(chunk, rating_num_map)
+    return coerce_bond_frame(chunk)
+
+
+def concat_typed_chunks(chunks):
+    """
+    Concatenate schema-typed chunks, unifying categorical columns so they stay categorical.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    for col in chunks[0].columns:
+        if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+            categories = union_categoricals([chunk[col].array for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+    return coerce_bond_frame(pd.concat(chunks, ignore_index=True).infer_objects())
+
+
+def read_excel_streaming(path, sheet_name=0, chunksize=50_000):
+    """
+    Read a whole sheet with iter_excel_chunks; peak memory stays close to the size of the
+    compact typed frame instead of a full object-typed sheet.
+    """
+    return concat_typed_chunks(iter_excel_chunks(path, chunksize, sheet_name))
+
+
+def _read_excel(path, sheet_name):
+    name = path if isinstance(path, (str, os.PathLike)) else getattr(path, 'name', '')
+    if os.fspath(name).lower().endswith(STREAMING_EXTENSIONS):
+        return read_excel_streaming(path, sheet_name)
+    return pd.read_excel(path, sheet_name=sheet_name)
+
+
+def _unique_tmp_path(path):
+    """
+    A new, empty temp file next to `path`, so concurrent writers of the same file never share one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f".{os.path.basename(path)}.",
+                                    suffix='.tmp')
+    os.close(fd)
+    return tmp_path
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    tmp_path = _unique_tmp_path(path)
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _cache_paths(path, sheet_name, cache_dir):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    stem = f"{os.path.basename(path)}.{sheet_name}"
+    return cache_dir, os.path.join(cache_dir, f"{stem}.json"), stem
+
+
+def read_excel_cached(path, sheet_name=0, cache_dir=None):
+    """
+    Read an Excel sheet through a columnar (Feather) cache.
+
+    The first read converts the sheet to an uncompressed Feather file next to the workbook
+    (in .rvm_cache/). Later reads memory-map that file instead of parsing the workbook.
+    The cache is keyed on path + size + mtime; when those change, the content hash decides
+    whether the workbook really changed, and the cache rebuilds itself if it did.
+    .xlsx workbooks are parsed with the streaming reader (read_excel_streaming) and come back
+    schema-typed. File-like objects (e.g. Streamlit uploads), a missing pyarrow, or sheets
+    that cannot be stored in Arrow format skip the cache.
+
+    :param path: Path to the workbook, or a file-like object.
+    :param sheet_name: Sheet to read (as for pd.read_excel).
+    :param cache_dir: Optional cache directory.
+    :return: DataFrame.
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        return _read_excel(path, sheet_name)
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return _read_excel(path, sheet_name)
+
+    path = os.fspath(path)
+    cache_dir, manifest_path, stem = _cache_paths(path, sheet_name, cache_dir)
+    stat = os.stat(path)
+
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if not os.path.exists(os.path.join(cache_dir, manifest['cache_file'])):
+            manifest = None
+
+    if manifest is not None and (manifest['size'], manifest['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        content_hash = file_sha256(path)
+        if content_hash == manifest['sha256']:
+            # Touched but unchanged: keep the cache, remember the new mtime
+            manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            atomic_write_json(manifest_path, manifest)
+        else:
+            manifest = None
+    else:
+        content_hash = None
+
+    if manifest is not None:
+        table = feather.read_table(os.path.join(cache_dir, manifest['cache_file']), memory_map=True)
+        return table.to_pandas()
+
+    df = _read_excel(path, sheet_name)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        print(f"Warning: {path} cannot be cached in columnar format ({e}). Reading Excel directly.")
+        return df
+
+    content_hash = content_hash or file_sha256(path)
+    cache_file = f"{stem}.{content_hash[:16]}.feather"
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = _unique_tmp_path(os.path.join(cache_dir, cache_file))
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, os.path.join(cache_dir, cache_file))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Drop cache files from earlier versions of this workbook
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}.") and name.endswith('.feather') and name != cache_file:
+            os.remove(os.path.join(cache_dir, name))
+
+    atomic_write_json(manifest_path, {
+        'path': os.path.abspath(path),
+        'sheet_name': sheet_name,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': content_hash,
+        'cache_file': cache_file
+    })
+    return df
@@ -0,0 +1,80 @@
+# bond_pricing/memo.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def frame_fingerprint(df):
+    """
+    Content fingerprint of a DataFrame: column names, dtypes, index and every value.
+
+    :return: Hex digest string; equal frames give equal fingerprints.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def params_fingerprint(*params):
+    """
+    Fingerprint of model parameters such as the rating map or the duration axis.
+    Dictionaries are compared by their sorted items, so key order does not matter.
+    """
+    normalised = [sorted(p.items()) if isinstance(p, dict) else p for p in params]
+    return hashlib.sha256(repr(normalised).encode()).hexdigest()
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe cache with least-recently-used eviction.
+
+    get_or_compute is single-flight: if several threads (e.g. Streamlit sessions) ask for
+    the same missing key at once, one computes it and the others wait for that result.
+    Cached values are shared, so callers must treat them as read-only.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return self._data[key]
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is computing this key; use its result once it is stored
+            event.wait()
+
+        try:
+            value = compute()
+            with self._lock:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
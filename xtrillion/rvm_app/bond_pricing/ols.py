@@ -0,0 +1,182 @@
+# bond_pricing/ols.py
+import numpy as np
+
+
+def fit_ols_batch(X, y, weights=None):
+    """
+    Fit a stack of ordinary least squares problems (with intercept) in one pass.
+
+    Each design matrix is centred, QR-factorised and solved together with the rest of
+    the batch, and R² comes from the same residuals, so there is no second scoring pass.
+    Subsets of one universe can share a batch by passing 0/1 weights.
+
+    :param X: Array of shape (batch, n, k) holding the regressors of every problem.
+    :param y: Array of shape (batch, n) holding the targets.
+    :param weights: Optional non-negative array of shape (batch, n).
+    :return: Tuple (intercepts of shape (batch,), coefficients of shape (batch, k), r2 of shape (batch,)).
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if X.ndim != 3 or y.shape != X.shape[:2]:
+        raise ValueError("Expected X of shape (batch, n, k) and y of shape (batch, n).")
+    if not (np.isfinite(X).all() and np.isfinite(y).all()):
+        raise ValueError("Input contains NaN or infinity.")
+
+    w = np.ones(y.shape) if weights is None else np.asarray(weights, dtype=float)
+    w_sum = w.sum(axis=1)
+    x_mean = np.einsum('bn,bnk->bk', w, X) / w_sum[:, np.newaxis]
+    y_mean = np.einsum('bn,bn->b', w, y) / w_sum
+
+    root_w = np.sqrt(w)
+    Xc = (X - x_mean[:, np.newaxis, :]) * root_w[..., np.newaxis]
+    yc = (y - y_mean[:, np.newaxis]) * root_w
+
+    try:
+        Q, R = np.linalg.qr(Xc)
+        coef = np.linalg.solve(R, np.einsum('bnk,bn->bk', Q, yc)[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        # Rank-deficient design: fall back to the minimum-norm solution
+        coef = (np.linalg.pinv(Xc) @ yc[..., np.newaxis])[..., 0]
+
+    intercept = y_mean - np.einsum('bk,bk->b', coef, x_mean)
+    ss_res = ((yc - np.einsum('bnk,bk->bn', Xc, coef)) ** 2).sum(axis=1)
+    ss_tot = (yc ** 2).sum(axis=1)
+    return intercept, coef, _r2_score(ss_res, ss_tot)
+
+
+def fit_ols(X, y, weights=None):
+    """
+    Fit a single OLS problem with intercept.
+
+    :param X: Array-like of shape (n, k).
+    :param y: Array-like of shape (n,).
+    :param weights: Optional array of shape (n,).
+    :return: Tuple (intercept, coefficients of shape (k,), r2).
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[np.newaxis]
+    intercept, coef, r2 = fit_ols_batch(X[np.newaxis], y[np.newaxis], weights)
+    return float(intercept[0]), coef[0], float(r2[0])
+
+
+def _r2_score(ss_res, ss_tot):
+    # Constant targets follow sklearn: a perfect fit scores 1.0, anything else 0.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = 1.0 - ss_res / ss_tot
+    return np.where(ss_tot > 0, r2, np.where(ss_res > 0, 0.0, 1.0))
+
+
+def ols_stats(X, y):
+    """
+    Sufficient statistics of one OLS problem in centred (co-moment) form.
+
+    Stored as counts, means and centred cross-products so that statistics from
+    different chunks or groups can be merged (and subtracted) without the
+    cancellation error of raw sums of squares.
+
+    :param X: Array-like of shape (n, k).
+    :param y: Array-like of shape (n,).
+    :return: Dict with 'n', 'x_mean', 'y_mean', 'cxx', 'cxy' and 'cyy'.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n == 0:
+        k = X.shape[1]
+        return {'n': 0.0, 'x_mean': np.zeros(k), 'y_mean': 0.0,
+                'cxx': np.zeros((k, k)), 'cxy': np.zeros(k), 'cyy': 0.0}
+    x_mean = X.mean(axis=0)
+    y_mean = y.mean()
+    Xc = X - x_mean
+    yc = y - y_mean
+    return {'n': float(n), 'x_mean': x_mean, 'y_mean': float(y_mean),
+            'cxx': Xc.T @ Xc, 'cxy': Xc.T @ yc, 'cyy': float(yc @ yc)}
+
+
+def merge_ols_stats(a, b):
+    """
+    Combine the statistics of two disjoint row sets (pairwise update of Chan et al.).
+    Works element-wise on batched statistics with matching leading dimensions.
+    """
+    n_a, n_b = np.asarray(a['n'], dtype=float), np.asarray(b['n'], dtype=float)
+    n = n_a + n_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w_b = np.where(n > 0, n_b / n, 0.0)
+        factor = np.where(n > 0, n_a * n_b / n, 0.0)
+    dx = np.asarray(b['x_mean']) - a['x_mean']
+    dy = np.asarray(b['y_mean']) - a['y_mean']
+    return {
+        'n': n,
+        'x_mean': a['x_mean'] + w_b[..., np.newaxis] * dx,
+        'y_mean': a['y_mean'] + w_b * dy,
+        'cxx': a['cxx'] + b['cxx'] + factor[..., np.newaxis, np.newaxis] * dx[..., :, np.newaxis] * dx[..., np.newaxis, :],
+        'cxy': a['cxy'] + b['cxy'] + factor[..., np.newaxis] * dx * dy[..., np.newaxis],
+        'cyy': a['cyy'] + b['cyy'] + factor * dy * dy,
+    }
+
+
+def subtract_ols_stats(total, part):
+    """
+    Remove the statistics of a subset of rows from the statistics of the whole.
+    Inverse of merge_ols_stats: merge_ols_stats(subtract_ols_stats(t, p), p) == t.
+    """
+    n_t, n_p = np.asarray(total['n'], dtype=float), np.asarray(part['n'], dtype=float)
+    n = n_t - n_p
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = np.where(n[..., np.newaxis] > 0,
+                          (n_t[..., np.newaxis] * total['x_mean'] - n_p[..., np.newaxis] * part['x_mean']) / n[..., np.newaxis],
+                          0.0)
+        y_mean = np.where(n > 0, (n_t * total['y_mean'] - n_p * part['y_mean']) / n, 0.0)
+        factor = np.where(n_t > 0, n * n_p / n_t, 0.0)
+    dx = np.asarray(part['x_mean']) - x_mean
+    dy = np.asarray(part['y_mean']) - y_mean
+    return {
+        'n': n,
+        'x_mean': x_mean,
+        'y_mean': y_mean,
+        'cxx': total['cxx'] - part['cxx'] - factor[..., np.newaxis, np.newaxis] * dx[..., :, np.newaxis] * dx[..., np.newaxis, :],
+        'cxy': total['cxy'] - part['cxy'] - factor[..., np.newaxis] * dx * dy[..., np.newaxis],
+        'cyy': total['cyy'] - part['cyy'] - factor * dy * dy,
+    }
+
+
+def fit_ols_stats(stats, min_obs=None):
+    """
+    Solve OLS from sufficient statistics (see ols_stats); batched over leading dimensions.
+
+    Problems with fewer than min_obs rows (default k + 1) or with a constant or
+    collinear regressor get NaN coefficients and R² instead of an arbitrary fit.
+
+    :return: Tuple (intercept, coefficients of shape (..., k), r2).
+    """
+    n = np.asarray(stats['n'], dtype=float)
+    x_mean = np.asarray(stats['x_mean'], dtype=float)
+    y_mean = np.asarray(stats['y_mean'], dtype=float)
+    cxx = np.asarray(stats['cxx'], dtype=float)
+    cxy = np.asarray(stats['cxy'], dtype=float)
+    cyy = np.asarray(stats['cyy'], dtype=float)
+    k = x_mean.shape[-1]
+    min_obs = k + 1 if min_obs is None else min_obs
+
+    # Judge collinearity on the correlation matrix so regressor scale (WARF vs ln(duration)) does not matter
+    variance = np.diagonal(cxx, axis1=-2, axis2=-1)
+    tolerance = 1e-12 * np.maximum(n[..., np.newaxis] * x_mean ** 2, 1.0)
+    valid = (n >= min_obs) & (variance > tolerance).all(axis=-1)
+    scale = np.sqrt(np.where(valid[..., np.newaxis], variance, 1.0))
+    corr = np.where(valid[..., np.newaxis, np.newaxis],
+                    cxx / (scale[..., :, np.newaxis] * scale[..., np.newaxis, :]),
+                    np.eye(k))
+    valid &= np.linalg.matrix_rank(corr) == k
+    corr = np.where(valid[..., np.newaxis, np.newaxis], corr, np.eye(k))
+
+    coef = np.linalg.solve(corr, (np.where(valid[..., np.newaxis], cxy, 0.0) / scale)[..., np.newaxis])[..., 0] / scale
+    intercept = y_mean - np.einsum('...k,...k->...', coef, x_mean)
+    ss_res = np.maximum(cyy - np.einsum('...k,...k->...', coef, cxy), 0.0)
+    r2 = _r2_score(ss_res, cyy)
+
+    coef = np.where(valid[..., np.newaxis], coef, np.nan)
+    intercept = np.where(valid, intercept, np.nan)
+    r2 = np.where(valid, r2, np.nan)
+    return intercept, coef, r2
@@ -0,0 +1,74 @@
+# bond_pricing/pipeline.py
+import numpy as np
+import pandas as pd
+
+from .calculations import perform_regressions, create_rvm_grids
+from .data_processing import add_model_columns
+from .schema import coerce_bond_frame
+
+# Define the correct rating_num_map with proper rating strings
+RATING_NUM_MAP = {
+    'Aaa': 1, 'Aa1': 2, 'Aa2': 3, 'Aa3': 4, 'A1': 5, 'A2': 6, 'A3': 7,
+    'Baa1': 8, 'Baa2': 9, 'Baa3': 10, 'Ba1': 11, 'Ba2': 12, 'Ba3': 13,
+    'B1': 14, 'B2': 15, 'B3': 16, 'Caa1': 17, 'Caa2': 18, 'Caa3': 19,
+    'Ca': 20, 'C': 21
+}
+
+# Duration axis (years) of the RVM grids
+RVM_DURATIONS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15, 20]
+
+REQUIRED_COLUMNS = ['OAD', 'OAS', 'YTW', 'ISIN', 'warf', 'Rating', 'rating_num']
+
+
+def process_bonds(df, rating_num_map=RATING_NUM_MAP):
+    return coerce_bond_frame(add_model_columns(df, rating_num_map))
+
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def build_warf_map_sorted(df, rating_num_map=RATING_NUM_MAP):
+    warf_map = dict(zip(df['Rating'], df['warf']))
+    warf_map_sorted = pd.DataFrame({
+        'rating': list(warf_map.keys()),
+        'warf': list(warf_map.values()),
+        'rating_num': [rating_num_map.get(rating, np.nan) for rating in warf_map.keys()]
+    })
+    return warf_map_sorted.dropna().sort_values('warf').reset_index(drop=True)
+
+
+def compute_rvm(df, rating_num_map=RATING_NUM_MAP, durations=RVM_DURATIONS):
+    """
+    Fit both models on a processed bond frame and build their RVM grids.
+
+    :param df: Output of process_bonds.
+    :return: Dict with 'rvm_num', 'rvm_warf' (rows in rating order), 'coeffs_num', 'r2_num',
+             'coeffs_warf', 'r2_warf' and 'bonds' (the rated bonds with model outputs).
+    """
+    df_num = df[df['rating_num'].notnull()].copy()
+
+    warf_map = dict(zip(df['Rating'], df['warf']))
+    warf_map_sorted = build_warf_map_sorted(df, rating_num_map)
+
+    df_num, coeffs_num, r2_num, df_warf, coeffs_warf, r2_warf = perform_regressions(df_num, warf_map_sorted)
+    df_num = coerce_bond_frame(df_num)
+
+    ratings_order = [rating for rating, _ in sorted(rating_num_map.items(), key=lambda x: x[1])]
+    rvm_num, rvm_warf = create_rvm_grids(
+        ratings_order, durations, coeffs_num, coeffs_warf, warf_map, rating_num_map
+    )
+
+    # Sort the RVM grids by the rating_num
+    rvm_num = rvm_num.loc[[rating for rating in ratings_order if rating in rvm_num.index]]
+    rvm_warf = rvm_warf.loc[[rating for rating in ratings_order if rating in rvm_warf.index]]
+
+    return {
+        'rvm_num': rvm_num,
+        'rvm_warf': rvm_warf,
+        'coeffs_num': coeffs_num,
+        'r2_num': r2_num,
+        'coeffs_warf': coeffs_warf,
+        'r2_warf': r2_warf,
+        'bonds': df_num
+    }
@@ -0,0 +1,87 @@
+# bond_pricing/results_store.py
+import os
+import threading
+
+from .ingest import _unique_tmp_path
+from .memo import frame_fingerprint
+
+
+class ResultsStore:
+    """
+    Versioned in-memory holder for the calculated bond frame, shared by all sessions.
+
+    publish() swaps in a new frame under a lock and persists it atomically (temp file +
+    os.replace) to a Feather file, which is reloaded on restart; a frame Arrow cannot store
+    is published in memory only. Readers get the current (version, frame) snapshot without
+    copying or parsing; frames are shared and must be treated as read-only. Publishing a frame identical to the current one is a no-op.
+    """
+
+    def __init__(self, path='bond_pricing_calcs.feather'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._version = 0
+        self._fingerprint = None
+        self._frame = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            import pyarrow.feather as feather
+            table = feather.read_table(self.path, memory_map=True)
+        except Exception as e:
+            print(f"Error reading stored results {self.path}: {e}")
+            return
+        metadata = table.schema.metadata or {}
+        self._frame = table.to_pandas()
+        self._version = int(metadata.get(b'version', b'1'))
+        self._fingerprint = metadata.get(b'fingerprint', b'').decode() or frame_fingerprint(self._frame)
+
+    def _persist(self, df, version, fingerprint):
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+        except ImportError:
+            return
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            print(f"Warning: results version {version} cannot be stored in {self.path} ({e}). Keeping it in memory only.")
+            return
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({b'version': str(version).encode(), b'fingerprint': fingerprint.encode()})
+        tmp_path = _unique_tmp_path(self.path)
+        try:
+            feather.write_feather(table.replace_schema_metadata(metadata), tmp_path, compression='uncompressed')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def publish(self, df):
+        """
+        Make df the current results.
+
+        :return: The version number of the stored frame.
+        """
+        fingerprint = frame_fingerprint(df)
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return self._version
+            version = self._version + 1
+            self._persist(df, version, fingerprint)
+            self._frame, self._version, self._fingerprint = df, version, fingerprint
+            return version
+
+    def latest(self):
+        """
+        :return: Tuple (version, frame), or (0, None) if nothing has been published.
+        """
+        with self._lock:
+            return self._version, self._frame
+
+    @property
+    def version(self):
+        return self._version
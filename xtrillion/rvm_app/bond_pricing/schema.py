@@ -0,0 +1,55 @@
+# bond_pricing/schema.py
+
+# Low-cardinality text columns
+CATEGORICAL_COLUMNS = ['Country', 'Ccy', 'Rating', 'Index Rating (String)', 'Sector']
+
+# Market data and model outputs: a few significant digits at most, float32 is enough
+FLOAT32_COLUMNS = [
+    'Price', 'YTW', 'OAD', 'OAS', 'MV (USD)', 'warf', 'rating_num',
+    'ln(spread)_predicted', 'spread_predicted', 'Return', 'Return_YTW',
+    'Rating Num Implied', 'WARF Implied', 'Notches'
+]
+
+# Regression inputs stay in full precision
+FLOAT64_COLUMNS = ['ln(duration)', 'ln(spread)']
+
+BOND_SCHEMA = {
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    **{col: 'float32' for col in FLOAT32_COLUMNS},
+    **{col: 'float64' for col in FLOAT64_COLUMNS},
+}
+
+
+def coerce_bond_frame(df, schema=None):
+    """
+    Convert the bond universe frame to its compact dtypes in one step.
+
+    Only columns present in df are touched; columns that cannot be converted
+    (e.g. text in a numeric column) are left as they are. Idempotent.
+
+    :param df: Bond DataFrame.
+    :param schema: Optional mapping of column name to dtype (default BOND_SCHEMA).
+    :return: The DataFrame with converted columns.
+    """
+    schema = BOND_SCHEMA if schema is None else schema
+    for col, dtype in schema.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        try:
+            df[col] = df[col].astype(dtype)
+        except (ValueError, TypeError):
+            print(f"Warning: column '{col}' could not be converted to {dtype}.")
+    return df
+
+
+def display_frame(df, decimals=6):
+    """
+    Copy of df for JSON-based display (e.g. AgGrid): float32 columns are widened to float64
+    and rounded, so 5.23 is sent as 5.23 rather than 5.2300000191.
+
+    :param df: Bond DataFrame.
+    :param decimals: Decimal places kept in the converted columns.
+    :return: New DataFrame.
+    """
+    columns = [col for col in df.columns if df[col].dtype == 'float32']
+    return df.astype({col: 'float64' for col in columns}).round({col: decimals for col in columns})
@@ -0,0 +1,96 @@
+# bond_pricing/streaming.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from .calculations import MODEL_FEATURES, _coeffs_dict
+from .data_processing import add_model_columns
+from .grouped import GROUP_FIT_COLUMNS, grouped_ols_stats
+from .ols import ols_stats, merge_ols_stats, fit_ols_stats
+
+
+def read_panel_chunks(path, chunksize=500_000, columns=None):
+    """
+    Read a historical bond panel from disk in chunks of at most `chunksize` rows.
+
+    :param path: CSV or Parquet file (Parquet needs pyarrow).
+    :param columns: Optional list of columns to read; leaving out unused text columns saves memory.
+    :return: Generator of DataFrames.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif extension == '.csv':
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+    else:
+        raise ValueError(f"Unsupported panel file type: {extension}")
+
+
+def _stats_table(keys, stats_list, min_bonds):
+    if not stats_list:
+        return pd.DataFrame(columns=GROUP_FIT_COLUMNS, index=pd.Index([], name='period'))
+    stats = {name: np.stack([np.asarray(stats[name]) for stats in stats_list]) for name in stats_list[0]}
+    intercept, coef, r2 = fit_ols_stats(stats, min_obs=min_bonds)
+    return pd.DataFrame({
+        'n_bonds': stats['n'].astype(int),
+        'intercept': intercept,
+        'coeff_ln_duration': coef[:, 0],
+        'coeff_rating': coef[:, 1],
+        'r2': r2,
+    }, index=pd.Index(keys, name='period'), columns=GROUP_FIT_COLUMNS)
+
+
+def fit_streaming_regression(chunks, model_type='Numerical', rating_num_map=None,
+                             date_column=None, period=None, min_bonds=10):
+    """
+    Fit ln(spread) ~ ln(duration) + rating over a panel too large for memory.
+
+    Each chunk is reduced to OLS sufficient statistics and merged into running totals,
+    so memory is bounded by one chunk plus one small statistics record per period.
+
+    :param chunks: Iterable of DataFrames, e.g. from read_panel_chunks.
+    :param model_type: 'Numerical' or 'WARF'.
+    :param rating_num_map: If given, chunks are passed through add_model_columns first;
+                           otherwise they must already have the regression columns.
+    :param date_column: Column holding the snapshot date; required when period is set.
+    :param period: None for the pooled fit only, 'D' for one fit per date or 'M' per month.
+    :return: Tuple (pooled coeffs dict, pooled r2, number of bonds used, per-period fit DataFrame or None).
+    """
+    if model_type not in MODEL_FEATURES:
+        raise ValueError("Invalid model_type. Choose 'Numerical' or 'WARF'.")
+    if period is not None and date_column is None:
+        raise ValueError("date_column is required for per-period fits.")
+    features = MODEL_FEATURES[model_type]
+
+    pooled = None
+    period_stats = {}
+    for chunk in chunks:
+        if rating_num_map is not None:
+            chunk = add_model_columns(chunk, rating_num_map)
+        values = chunk[features + ['ln(spread)']].to_numpy(dtype=float)
+        finite = np.isfinite(values).all(axis=1)
+
+        chunk_stats = ols_stats(values[finite, :-1], values[finite, -1])
+        pooled = chunk_stats if pooled is None else merge_ols_stats(pooled, chunk_stats)
+
+        if period is not None:
+            periods = pd.to_datetime(chunk[date_column]).dt.to_period(period)
+            keys, group_stats = grouped_ols_stats(chunk.assign(period=periods), 'period', features)
+            for i, key in enumerate(keys):
+                stats_i = {name: value[i] for name, value in group_stats.items()}
+                period_stats[key] = merge_ols_stats(period_stats[key], stats_i) if key in period_stats else stats_i
+
+    if pooled is None:
+        raise ValueError("No data to fit.")
+    intercept, coef, r2 = fit_ols_stats(pooled)
+    coeffs = _coeffs_dict(intercept, coef)
+
+    period_fits = None
+    if period is not None:
+        keys = sorted(period_stats)
+        period_fits = _stats_table(keys, [period_stats[key] for key in keys], min_bonds)
+
+    return coeffs, float(r2), int(pooled['n']), period_fits
@@ -6,8 +6,19 @@ import pandas as pd
 import numpy as np
 import os
 import json
-from bond_pricing.calculations import perform_regressions, create_rvm_grids
-from bond_pricing.utils import create_spread_duration_plot, get_rating_from_string
+from bond_pricing.pipeline import (RATING_NUM_MAP, RVM_DURATIONS, process_bonds, missing_columns, compute_rvm,
+                                   build_warf_map_sorted as pipeline_warf_map_sorted)
+from bond_pricing.batch import output_path as batch_output_path, load_outputs as load_batch_outputs
+from bond_pricing.grouped import perform_grouped_regression, create_group_rvm_grid
+from bond_pricing.incremental import IncrementalRVM
+from bond_pricing.bootstrap import bootstrap_regressions, bootstrap_rvm_grids
+from bond_pricing.utils import create_spread_duration_plot
+from bond_pricing.data_processing import IsinIndex
+from bond_pricing.ingest import read_excel_cached, file_sha256
+from bond_pricing.memo import LRUCache, frame_fingerprint, params_fingerprint
+from bond_pricing.results_store import ResultsStore
+from bond_pricing.schema import display_frame
+from stage_timing import timed_rerun, timing_panel
 from bond_pricing.auth import login, signup, change_password, delete_config, is_admin, load_config
 from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
 import sys
@@ -19,61 +30,178 @@ app_dir = os.path.dirname(os.path.abspath(__file__))
 # Add the bond_pricing folder to the Python path
 sys.path.append(os.path.join(app_dir, 'bond_pricing'))
 
-# Define the correct rating_num_map with proper rating strings
-rating_num_map = {
-    'Aaa': 1, 'Aa1': 2, 'Aa2': 3, 'Aa3': 4, 'A1': 5, 'A2': 6, 'A3': 7,
-    'Baa1': 8, 'Baa2': 9, 'Baa3': 10, 'Ba1': 11, 'Ba2': 12, 'Ba3': 13,
-    'B1': 14, 'B2': 15, 'B3': 16, 'Caa1': 17, 'Caa2': 18, 'Caa3': 19,
-    'Ca': 20, 'C': 21
-}
+rating_num_map = RATING_NUM_MAP
 
 # Sort ratings by their numerical value
 sorted_ratings = sorted(rating_num_map.items(), key=lambda x: x[1])
 
+rvm_durations = RVM_DURATIONS
+
+# Nightly outputs of bond_pricing.batch, read instead of recomputing when they match the workbook
+precomputed_dir = 'rvm_outputs'
+
+# Columns offered for per-group RVM fits (sector bucket only if the workbook has one)
+group_columns = ['Country', 'Ccy', 'Sector']
+
 def load_data(file):
     try:
-        df = pd.read_excel(file)
+        df = read_excel_cached(file)
         return df
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
 
 def process_data(df):
-    if 'Rating' not in df.columns and 'Index Rating (String)' in df.columns:
-        df['Rating'] = df['Index Rating (String)'].apply(get_rating_from_string)
+    return process_bonds(df, rating_num_map)
 
-    df['Rating'] = df['Rating'].apply(lambda x: x.capitalize() if isinstance(x, str) else x)
-    df['rating_num'] = df['Rating'].map(rating_num_map)
-    df['ln(duration)'] = np.log(df['OAD'])
-    df['ln(spread)'] = np.log(df['OAS'])
+def build_warf_map_sorted(df):
+    return pipeline_warf_map_sorted(df, rating_num_map)
 
-    return df
+def _grid_results(results):
+    return results['rvm_num'], results['rvm_warf'], results['r2_num'], results['r2_warf'], results['bonds']
 
 def generate_rvm_grids(df):
-    df_num = df[df['rating_num'].notnull()].copy()
-    
-    warf_map = dict(zip(df['Rating'], df['warf']))
-    warf_map_sorted = pd.DataFrame({
-        'rating': list(warf_map.keys()),
-        'warf': list(warf_map.values()),
-        'rating_num': [rating_num_map.get(rating, np.nan) for rating in warf_map.keys()]
-    })
-    warf_map_sorted = warf_map_sorted.dropna().sort_values('warf').reset_index(drop=True)
+    return _grid_results(compute_rvm(df, rating_num_map, rvm_durations))
+
+@st.cache_resource
+def get_rvm_pipeline_cache():
+    # One cache per server process, shared by all sessions
+    return LRUCache(maxsize=8)
+
+@st.cache_resource
+def get_results_index_cache():
+    # ISIN indexes of the stored calculations, one per results version
+    return LRUCache(maxsize=2)
+
+@st.cache_resource
+def get_results_store():
+    # Calculated bond frame shared by all sessions (RVM Calculator -> Analysis)
+    return ResultsStore('bond_pricing_calcs.feather')
+
+def run_rvm_pipeline(df):
+    """
+    process_data -> generate_rvm_grids, memoized on a fingerprint of the raw frame and the
+    model parameters. Returns (processed df, missing columns, generate_rvm_grids results or None).
+    The results are shared between sessions and must not be modified.
+    """
+    key = (frame_fingerprint(df), params_fingerprint(rating_num_map, rvm_durations))
+
+    def compute():
+        df_processed = process_data(df)
+        missing = missing_columns(df_processed)
+        rvm_results = None if missing else generate_rvm_grids(df_processed)
+        return df_processed, missing, rvm_results
+
+    return get_rvm_pipeline_cache().get_or_compute(key, compute)
+
+@st.cache_resource
+def get_workbook_hashes():
+    # path -> (size, mtime_ns, sha256), shared by all sessions
+    return {}
+
+def workbook_sha256(path):
+    # Hash the workbook only when its size or mtime changed since the last call
+    stat = os.stat(path)
+    hashes = get_workbook_hashes()
+    cached = hashes.get(path)
+    if cached is None or cached[:2] != (stat.st_size, stat.st_mtime_ns):
+        cached = (stat.st_size, stat.st_mtime_ns, file_sha256(path))
+        hashes[path] = cached
+    return cached[2]
+
+def load_precomputed_rvm(workbook):
+    """
+    generate_rvm_grids results written by the nightly batch run for this workbook,
+    or None if there are none for its current contents.
+    """
+    target = batch_output_path(precomputed_dir, workbook)
+    if not os.path.exists(target):
+        return None
+    # A new batch run swaps in a new directory, which changes its mtime
+    key = ('precomputed', workbook_sha256(workbook), os.stat(target).st_mtime_ns)
+
+    def compute():
+        results = load_batch_outputs(target, workbook)
+        return None if results is None else _grid_results(results)
 
-    df_num, coeffs_num, r2_num, df_warf, coeffs_warf, r2_warf = perform_regressions(df_num, warf_map_sorted)
+    return get_rvm_pipeline_cache().get_or_compute(key, compute)
 
+def generate_group_rvm_grid(df, group_fits, group):
+    warf_map = dict(zip(df['Rating'], df['warf']))
     ratings_order = [rating for rating, _ in sorted_ratings]
-    durations = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15, 20]
+    durations = rvm_durations
 
-    rvm_num, rvm_warf = create_rvm_grids(
-        ratings_order, durations, coeffs_num, coeffs_warf, warf_map, rating_num_map
-    )
+    rvm_group = create_group_rvm_grid(group_fits, group, ratings_order, durations, 'Numerical', warf_map, rating_num_map)
+    if rvm_group is not None:
+        rvm_group = rvm_group.loc[[rating for rating, _ in sorted_ratings if rating in rvm_group.index]]
+    return rvm_group
 
-    # Sort the RVM grids by the rating_num
-    rvm_num = rvm_num.loc[[rating for rating, _ in sorted_ratings if rating in rvm_num.index]]
-    rvm_warf = rvm_warf.loc[[rating for rating, _ in sorted_ratings if rating in rvm_warf.index]]
+def generate_bootstrap_bands(df_calc, time_budget=5.0):
+    warf_map = dict(zip(df_calc['Rating'], df_calc['warf']))
+    ratings_order = [rating for rating, _ in sorted_ratings]
+    durations = rvm_durations
+
+    boot = bootstrap_regressions(df_calc, n_boot=2000, seed=0, time_budget=time_budget)
+    grids = bootstrap_rvm_grids(boot, ratings_order, durations, warf_map, rating_num_map)
+    # Same rating order as the point-estimate grids
+    grids = [grid.loc[[rating for rating, _ in sorted_ratings if rating in grid.index]] for grid in grids]
+    return boot, grids
+
+def get_rvm_model(df, source_key):
+    # One incrementally updatable model per session, rebuilt only when the stored calculations change
+    if st.session_state.get('rvm_model_key') != source_key:
+        st.session_state['rvm_model'] = IncrementalRVM(df[df['rating_num'].notnull()], build_warf_map_sorted(df))
+        st.session_state['rvm_model_key'] = source_key
+        st.session_state['rvm_model_upload'] = None
+    return st.session_state['rvm_model']
+
+def get_results_index(df, version):
+    """
+    ISIN index of the stored calculations, built once per version and shared by all sessions;
+    it must not be modified (use IsinIndex.union_frame).
+    """
+    return get_results_index_cache().get_or_compute(version, lambda: IsinIndex(df))
+
+def filter_bonds(df, filters):
+    """
+    Rows of df passing the Analysis filters (min_notches, min_return_yield, min_yield, countries, ratings).
+    """
+    min_notches, min_return_yield, min_yield, countries, ratings = filters
+    mask = (df['Notches'] >= min_notches) & (df['Return_YTW'] >= min_return_yield) & (df['YTW'] >= min_yield)
+    if countries:
+        mask &= df['Country'].isin(countries)
+    if ratings:
+        mask &= df['Rating'].isin(ratings)
+    return df[mask]
+
+def apply_uploaded_bonds(model, uploaded_df=None, upload_key=None, replace_prices=False):
+    """
+    Apply an uploaded sheet to the session model in O(uploaded bonds), undoing the previous upload first.
+    Calling it without an upload reverts the model to the stored universe.
+    """
+    applied = st.session_state.get('rvm_model_upload')
+    if applied is not None and applied['key'] == upload_key:
+        return
+    if applied is not None:
+        model.remove(applied['added'])
+        if not applied['replaced'].empty:
+            model.replace(applied['replaced'])
+        st.session_state['rvm_model_upload'] = None
+    if uploaded_df is None:
+        return
 
-    return rvm_num, rvm_warf, r2_num, r2_warf, df_num
+    known = uploaded_df['ISIN'].isin(model.isins)
+    if replace_prices:
+        replaced = model.bonds.loc[uploaded_df.loc[known, 'ISIN'].unique()].reset_index(drop=True)
+        model.replace(uploaded_df)
+    else:
+        replaced = model.bonds.iloc[0:0]
+        model.add(uploaded_df[~known])
+    st.session_state['rvm_model_upload'] = {
+        'key': upload_key,
+        'added': uploaded_df.loc[~known, 'ISIN'].unique().tolist(),
+        'replaced': replaced
+    }
 
 def login_page():
     st.title('Login')
@@ -125,54 +253,101 @@ def settings_page():
         st.session_state['logged_in'] = False
         st.rerun()
 
-def rvm_calc_page(is_admin):
+def rvm_calc_page(is_admin, timer):
     st.title('Relative Value Model (RVM) Calculator')
 
     if 'bond_pricing.xlsx' in os.listdir():
-        df = load_data('bond_pricing.xlsx')
+        with timer.stage('load_precomputed'):
+            rvm_results = load_precomputed_rvm('bond_pricing.xlsx')
+        missing = []
+        df = None
+        if rvm_results is None:
+            with timer.stage('read_excel') as stage:
+                df = load_data('bond_pricing.xlsx')
+                stage['rows'] = None if df is None else len(df)
         if df is not None:
-            df = process_data(df)
+            with st.spinner('Calculating RVM grids...'), timer.stage('rvm_pipeline', rows=len(df)):
+                df, missing, rvm_results = run_rvm_pipeline(df)
 
+        if rvm_results is not None or missing:
             st.subheader('Risk-Value Matrix (RVM) Grids')
 
-            required_columns = ['OAD', 'OAS', 'YTW', 'ISIN', 'warf', 'Rating', 'rating_num']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                st.warning(f"Unable to create RVM Grids. Missing columns: {', '.join(missing_columns)}")
+            if missing:
+                st.warning(f"Unable to create RVM Grids. Missing columns: {', '.join(missing)}")
             else:
-                with st.spinner('Calculating RVM grids...'):
-                    rvm_num, rvm_warf, r2_num, r2_warf, df_calc = generate_rvm_grids(df)
+                rvm_num, rvm_warf, r2_num, r2_warf, df_calc = rvm_results
                 
                 st.success('RVM calculations completed!')
 
                 # Store the calculated data
-                df_calc.to_csv('bond_pricing_calcs.csv', index=False)
+                with timer.stage('publish_results', rows=len(df_calc)):
+                    get_results_store().publish(df_calc)
 
                 st.subheader('Numerical Rating RVM Grid')
                 # Display RVM grid to 0 decimal places
-                st.dataframe(rvm_num.round(0).style.format("{:.0f}").apply(lambda _: ['background-color: #2f2f2f' if i % 2 == 0 else '' for i in range(len(_))], axis=0))
+                with timer.stage('styler_rvm_num', rows=len(rvm_num)):
+                    st.dataframe(rvm_num.round(0).style.format("{:.0f}").apply(lambda _: ['background-color: #2f2f2f' if i % 2 == 0 else '' for i in range(len(_))], axis=0))
 
                 if is_admin:
                     st.subheader('WARF-based RVM Grid')
                     # Display RVM grid to 0 decimal places
-                    st.dataframe(rvm_warf.round(0).style.format("{:.0f}").apply(lambda _: ['background-color: #2f2f2f' if i % 2 == 0 else '' for i in range(len(_))], axis=0))
+                    with timer.stage('styler_rvm_warf', rows=len(rvm_warf)):
+                        st.dataframe(rvm_warf.round(0).style.format("{:.0f}").apply(lambda _: ['background-color: #2f2f2f' if i % 2 == 0 else '' for i in range(len(_))], axis=0))
 
                     st.subheader('Model Performance')
                     st.write(f"Numerical Rating-based Model R-squared: {r2_num:.4f}")
                     st.write(f"WARF-based Model R-squared: {r2_warf:.4f}")
+
+                    st.subheader('Model Stability (Bootstrap, 95% intervals)')
+                    if st.button('Run bootstrap'):
+                        with st.spinner('Resampling bonds...'), timer.stage('bootstrap', rows=len(df_calc)):
+                            boot, (lower_num, upper_num, lower_warf, upper_warf) = generate_bootstrap_bands(df_calc)
+                        st.write(f"Bootstrap replicates completed: {boot['n_boot']}")
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.write("Numerical model coefficients")
+                            st.dataframe(boot['coeffs_num'])
+                        with col2:
+                            st.write("WARF model coefficients")
+                            st.dataframe(boot['coeffs_warf'])
+                        st.write("Numerical Rating RVM Grid - lower bound")
+                        st.dataframe(lower_num.round(0).style.format("{:.0f}"))
+                        st.write("Numerical Rating RVM Grid - upper bound")
+                        st.dataframe(upper_num.round(0).style.format("{:.0f}"))
+                        st.write("WARF-based RVM Grid - lower bound")
+                        st.dataframe(lower_warf.round(0).style.format("{:.0f}"))
+                        st.write("WARF-based RVM Grid - upper bound")
+                        st.dataframe(upper_warf.round(0).style.format("{:.0f}"))
+
+                    st.subheader('Grouped RVM Fits')
+                    group_options = [col for col in group_columns if col in df_calc.columns]
+                    selected_group_cols = st.multiselect('Fit a separate curve per', group_options)
+                    if selected_group_cols:
+                        with timer.stage('grouped_regression', rows=len(df_calc)):
+                            group_fits = perform_grouped_regression(df_calc, selected_group_cols, 'Numerical')
+                        st.dataframe(group_fits.style.format({'intercept': "{:.4f}", 'coeff_ln_duration': "{:.4f}", 'coeff_rating': "{:.4f}", 'r2': "{:.4f}"}))
+
+                        fitted_groups = group_fits.dropna().index.tolist()
+                        if fitted_groups:
+                            selected_group = st.selectbox('Show RVM grid for', fitted_groups)
+                            rvm_group = generate_group_rvm_grid(df_calc, group_fits, selected_group)
+                            st.dataframe(rvm_group.round(0).style.format("{:.0f}").apply(lambda _: ['background-color: #2f2f2f' if i % 2 == 0 else '' for i in range(len(_))], axis=0))
     else:
         st.info("Bond pricing data not available. Please contact an administrator.")
 
-def analysis_page():
+def analysis_page(timer):
     st.title('Analysis')
     
     # Load the stored calculations
-    if os.path.exists('bond_pricing_calcs.csv'):
-        df = pd.read_csv('bond_pricing_calcs.csv')
-    else:
-        st.error("Calculated data not found. Please run the RVM Calculator first.")
-        return
+    with timer.stage('load_results') as stage:
+        version, results = get_results_store().latest()
+        if results is None:
+            st.error("Calculated data not found. Please run the RVM Calculator first.")
+            return
+        model = get_rvm_model(results, version)
+        # The stored frame is shared between sessions; work on a copy
+        df = results.copy()
+        stage['rows'] = len(df)
 
     # Apply filters
     st.subheader("Filters")
@@ -211,27 +386,48 @@ def analysis_page():
         
         apply_filters = st.form_submit_button("Apply Filters")
 
+    filters = None
     if apply_filters:
-        # Apply filters
-        df = df[df['Notches'] >= min_notches]
-        df = df[df['Return_YTW'] >= min_return_yield]
-        df = df[df['YTW'] >= min_yield]
-        if selected_countries:
-            df = df[df['Country'].isin(selected_countries)]
-        if selected_ratings:
-            df = df[df['Rating'].isin(selected_ratings)]
+        filters = (min_notches, min_return_yield, min_yield, selected_countries, selected_ratings)
+        with timer.stage('filters') as stage:
+            df = filter_bonds(df, filters)
+            stage['rows'] = len(df)
 
     # Option to upload a file
     uploaded_file = st.file_uploader("Upload your Excel file (optional)", type=["xlsx", "xls"])
 
     if uploaded_file is not None:
-        uploaded_df = load_data(uploaded_file)
+        with timer.stage('read_upload') as stage:
+            uploaded_df = load_data(uploaded_file)
+            stage['rows'] = None if uploaded_df is None else len(uploaded_df)
         if uploaded_df is not None:
             use_full_set = st.checkbox("Include full dataset with uploaded bonds", value=False)
-            if use_full_set:
-                df = pd.concat([df, uploaded_df]).drop_duplicates(subset=['ISIN'], keep='first')
+            can_score = all(col in uploaded_df.columns for col in ['ISIN', 'OAD', 'OAS', 'YTW', 'warf']) and \
+                ('Rating' in uploaded_df.columns or 'Index Rating (String)' in uploaded_df.columns)
+            if not can_score:
+                apply_uploaded_bonds(model)
+                if use_full_set:
+                    # Existing bonds win; only ISINs not already in the dataset are added
+                    df = get_results_index(results, version).union_frame(uploaded_df)
+                    if filters is not None:
+                        df = filter_bonds(df, filters)
+                else:
+                    df = uploaded_df
+            elif use_full_set:
+                replace_prices = st.checkbox("Use uploaded prices for bonds already in the dataset", value=False)
+                with timer.stage('score_upload', rows=len(uploaded_df)):
+                    uploaded_df = process_data(uploaded_df)
+                    apply_uploaded_bonds(model, uploaded_df, (uploaded_file.name, uploaded_file.size, replace_prices), replace_prices)
+                    # Coefficients were updated incrementally; refresh Notches/Return_YTW for the visible bonds
+                    visible_isins = set(df['ISIN']) | set(uploaded_df['ISIN'])
+                    df_model = model.frame()
+                    df = df_model[df_model['ISIN'].isin(visible_isins)]
             else:
-                df = uploaded_df
+                apply_uploaded_bonds(model)
+                with timer.stage('score_upload', rows=len(uploaded_df)):
+                    df = model.score(process_data(uploaded_df))
+    else:
+        apply_uploaded_bonds(model)
 
     # Round the spread to the nearest integer
     df['OAS'] = df['OAS'].round().astype(int)
@@ -249,7 +445,8 @@ def analysis_page():
         'Notches', 'WARF Implied'
     ]
     
-    df_display = df[columns_to_display]
+    # float32 values would reach the grid as e.g. 5.2300000191
+    df_display = display_frame(df[columns_to_display])
 
     gb = GridOptionsBuilder.from_dataframe(df_display)
     gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=20)  # Set initial page size to 20
@@ -263,21 +460,22 @@ def analysis_page():
     
     gridOptions = gb.build()
 
-    grid_response = AgGrid(
-        df_display,
-        gridOptions=gridOptions,
-        data_return_mode='AS_INPUT', 
-        update_mode='MODEL_CHANGED', 
-        fit_columns_on_grid_load=False,
-        theme='streamlit', 
-        enable_enterprise_modules=True,
-        height=400,  # Set initial height
-        width='100%',
-        reload_data=True,
-        custom_css={
-            ".ag-row-even": {"background-color": "#2f2f2f !important"},
-        }
-    )
+    with timer.stage('aggrid', rows=len(df_display)):
+        grid_response = AgGrid(
+            df_display,
+            gridOptions=gridOptions,
+            data_return_mode='AS_INPUT', 
+            update_mode='MODEL_CHANGED', 
+            fit_columns_on_grid_load=False,
+            theme='streamlit', 
+            enable_enterprise_modules=True,
+            height=400,  # Set initial height
+            width='100%',
+            reload_data=True,
+            custom_css={
+                ".ag-row-even": {"background-color": "#2f2f2f !important"},
+            }
+        )
 
     # Add pagination controls
     st.write("Rows per page:")
@@ -357,16 +555,20 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
-        if st.sidebar.button('Logout'):
-            st.session_state['logged_in'] = False
-            st.rerun()
+        # Finishes the timer however the rerun ends (st.rerun, st.stop or an exception)
+        with timed_rerun(page) as timer:
+            if st.sidebar.button('Logout'):
+                st.session_state['logged_in'] = False
+                st.rerun()
 
-        if page == 'RVM Calculator':
-            rvm_calc_page(admin_status)
-        elif page == 'Analysis':
-            analysis_page()
-        elif page == 'Settings':
-            settings_page()
+            if page == 'RVM Calculator':
+                rvm_calc_page(admin_status, timer)
+            elif page == 'Analysis':
+                analysis_page(timer)
+            elif page == 'Settings':
+                settings_page()
+
+            timing_panel(timer, admin_status)
 
 if __name__ == "__main__":
     main()
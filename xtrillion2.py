@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import requests
-from credit_reports import create_country_report_tab
-from report_utils import create_fund_report_tab
+from report_utils import report_cache_panel
+from report_tabs import load_report_config, fetch_reports, render_report
 
 # Set page configuration
 st.set_page_config(layout="wide")
@@ -69,15 +69,10 @@ color_palette = [
     "#DA70D6"   # Vivid Purple
 ]
 
-# Available reports
-available_reports = {
-    "Israel": "Israel",
-    "Qatar": "Qatar",
-    "Mexico": "Mexico",
-    "Saudi Arabia": "Saudi Arabia",
-    "Shin Kong Emerging Wealthy Nations Bond Fund": "SKEWNBF",
-    "Shin Kong Environmental Sustainability Bond Fund": "SKESBF"
-}
+# Available reports (name -> tab label)
+reports = load_report_config()
+reports_by_label = {report["label"]: report for report in reports}
+available_reports = {report["entity"]: report["label"] for report in reports}
 
 # Initialize session state to manage selected reports
 if "selected_reports" not in st.session_state:
@@ -108,6 +103,7 @@ def display_chatbot():
 
 # Display the chatbot on the right side
 display_chatbot()
+report_cache_panel()
 
 # Show checkboxes only if reports have been requested
 if st.session_state.selected_reports:
@@ -135,23 +131,6 @@ if st.session_state.dropdown_reports:
         index=st.session_state.dropdown_reports.index(st.session_state.last_selected)  # Automatically select the last requested report
     )
 
-    # Display the content of the selected report
-    if selected_report == "Israel":
-        create_country_report_tab("Israel", color_palette)
-
-    elif selected_report == "Qatar":
-        create_country_report_tab("Qatar", color_palette)
-
-    elif selected_report == "Mexico":
-        create_country_report_tab("Mexico", color_palette)
-
-    elif selected_report == "Saudi Arabia":
-        create_country_report_tab("Saudi Arabia", color_palette)
-
-    elif selected_report == "SKEWNBF":
-        create_fund_report_tab("Shin Kong Emerging Wealthy Nations Bond Fund", color_palette)
-
-    elif selected_report == "SKESBF":
-        create_fund_report_tab("Shin Kong Environmental Sustainability Bond Fund", color_palette)
-
-
+    # Fetch the requested reports in one batched query per table, then display the selected one
+    report_data = fetch_reports([reports_by_label[label] for label in st.session_state.dropdown_reports])
+    render_report(reports_by_label[selected_report], color_palette, report_data[selected_report])